@@ -1,52 +1,99 @@
-import os, asyncio, json, uuid
+import os, asyncio, hashlib, json, logging, re, socket, tarfile, threading, time, traceback
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends, UploadFile, File, Form
+from typing import BinaryIO, Iterator
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, Depends, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from kubernetes import config  # type: ignore
-from kubernetes.client import CustomObjectsApi, CoreV1Api  # type: ignore
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from kubernetes import config, watch  # type: ignore
+from kubernetes.client import ApiClient, Configuration, CustomObjectsApi, CoreV1Api  # type: ignore
+from kubernetes.client.rest import ApiException  # type: ignore
 from kubernetes.stream import stream  # type: ignore
-from sqlalchemy.orm import Session
-from app.database import init_db, get_db, TaskLog, Task, TaskRun, SessionLocal, Flow, FlowRun, FlowStepRun, FlowStepLog  # type: ignore
+from sqlalchemy import select, update, bindparam, func, text
+from sqlalchemy.orm import Session, joinedload, selectinload, undefer
+from app.database import init_db, get_db, log_batcher, table_columns, upsert_task_logs, TaskLog, Task, TaskRun, SessionLocal, Flow, FlowRun, FlowStepRun, FlowStepLog  # type: ignore
 
 # Hera SDK integration (required)
 try:
-    from app.workflow_hera import create_workflow_with_hera  # type: ignore
+    from app.workflow_hera import create_workflow_with_hera, k8s_api_client  # type: ignore
     from app.workflow_hera_flow import create_flow_workflow_with_hera, generate_flow_workflow_template  # type: ignore
 except ImportError as e:
     raise ImportError(f"Hera SDK is required but not available: {e}. Please install hera: poetry add hera")
 
+# Log formatting is deferred until a record passes the level check (LOG_LEVEL, default INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+
+try:
+    import orjson
+
+    def dump_json(value) -> str:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    load_json = orjson.loads
+except ImportError:
+    # Fallback to the standard library if orjson is not available
+    orjson = None
+
+    def dump_json(value) -> str:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+    load_json = json.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes with orjson when it is installed (log payloads are large strings)."""
+    
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+async def send_ws_json(websocket: WebSocket, payload: dict) -> None:
+    """Send a JSON text frame, encoded like the HTTP responses."""
+    await websocket.send_text(dump_json(payload))
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
     # Startup
     try:
         init_db()
-        print("Database initialized successfully")
+        logger.info("Database initialized successfully")
+        log_batcher.start()
     except Exception as e:
-        print(f"Warning: Could not initialize database: {e}. Logs will not be persisted.")
+        logger.warning("Could not initialize database: %s. Logs will not be persisted.", e)
+    
+    # Keep workflow status in memory for list endpoints
+    workflow_informer.start()
     
     # Initialize persistent PV pod for fast file operations
     try:
         pod = get_persistent_pv_pod()
         pod.create_pod()
-        print("Persistent PV pod initialized successfully")
+        logger.info("Persistent PV pod initialized successfully")
     except Exception as e:
-        print(f"Warning: Could not initialize persistent PV pod: {e}. File operations will be slower.")
+        logger.warning("Could not initialize persistent PV pod: %s. File operations will be slower.", e)
     
     yield
     
     # Shutdown
+    # Write out queued logs before the process exits
+    log_batcher.drain()
+    workflow_informer.stop()
+    
     global _persistent_pv_pod
     if _persistent_pv_pod:
         try:
             _persistent_pv_pod.cleanup()
         except Exception as e:
-            print(f"Error cleaning up persistent PV pod: {e}")
+            logger.error("Error cleaning up persistent PV pod: %s", e)
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Configure CORS
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000").split(",")
@@ -62,81 +109,108 @@ app.add_middleware(
 # Supports both in-cluster config (when running in K8s) and external config (local dev or external cluster)
 KUBERNETES_CLUSTER_TYPE = os.getenv("KUBERNETES_CLUSTER_TYPE", "auto")  # "auto", "kind", "eks", "external"
 KUBECONFIG_PATH = os.getenv("KUBECONFIG", os.path.expanduser("~/.kube/config"))
+ARGO_NAMESPACE = os.getenv("ARGO_NAMESPACE", "argo")
 
-try:
-    config.load_incluster_config()
-    print("Using in-cluster Kubernetes configuration")
-except:
-    # Load kubeconfig from specified path or default location
-    if os.path.exists(KUBECONFIG_PATH):
-        config.load_kube_config(config_file=KUBECONFIG_PATH)
-        print(f"Loaded Kubernetes config from {KUBECONFIG_PATH}")
-    else:
-        config.load_kube_config()
-        print("Loaded Kubernetes config from default location")
-    
-    # Get the configuration to check the server URL
-    from kubernetes.client import Configuration
-    configuration = Configuration.get_default_copy()
-    
-    # Determine if we should apply KinD patches
-    # Check if explicitly set to kind, or auto-detect by checking if server is localhost
-    is_explicit_kind = KUBERNETES_CLUSTER_TYPE == "kind"
-    is_explicit_kind_flag = os.getenv("KIND_CLUSTER", "").lower() == "true"
-    is_localhost = configuration.host and ('127.0.0.1' in configuration.host or 'localhost' in configuration.host)
-    
-    should_patch_kind = (
-        is_explicit_kind or 
-        (KUBERNETES_CLUSTER_TYPE == "auto" and (is_explicit_kind_flag or is_localhost))
-    )
+# Workflow phases after which nothing further changes
+TERMINAL_PHASES = frozenset(("Succeeded", "Failed", "Error"))
+
+
+def configure_kubernetes() -> None:
+    """Load the cluster config and, for KinD, patch the default client Configuration."""
+    try:
+        config.load_incluster_config()
+        logger.info("Using in-cluster Kubernetes configuration")
+    except:
+        # Load kubeconfig from specified path or default location
+        if os.path.exists(KUBECONFIG_PATH):
+            config.load_kube_config(config_file=KUBECONFIG_PATH)
+            logger.info("Loaded Kubernetes config from %s", KUBECONFIG_PATH)
+        else:
+            config.load_kube_config()
+            logger.info("Loaded Kubernetes config from default location")
     
-    if should_patch_kind:
-        # Check if we're running inside Docker
-        # Only patch to host.docker.internal if running inside Docker
-        running_in_docker = os.path.exists('/.dockerenv') or os.environ.get('DOCKER_CONTAINER') == 'true'
-        
-        # Patch configuration for Docker: replace 127.0.0.1 with host.docker.internal
-        # and disable SSL verification for development (kind uses self-signed certs)
-        import urllib3
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        
-        if configuration.host and ('127.0.0.1' in configuration.host or 'localhost' in configuration.host):
-            if running_in_docker:
-                # Replace both 127.0.0.1 and localhost with host.docker.internal (only when in Docker)
-                configuration.host = configuration.host.replace('127.0.0.1', 'host.docker.internal')
-                configuration.host = configuration.host.replace('localhost', 'host.docker.internal')
-                print("Applied KinD-specific configuration patches (localhost -> host.docker.internal) for Docker")
-            else:
-                # Running locally, keep localhost but disable SSL verification for KinD
-                print("Running locally, using localhost for KinD cluster")
-            
-            # Disable SSL verification for development (kind uses self-signed certs)
-            configuration.verify_ssl = False
-            Configuration.set_default(configuration)
-    elif KUBERNETES_CLUSTER_TYPE in ("eks", "external"):
-        # For external clusters (EKS, etc.), use standard configuration
-        print(f"Using external Kubernetes cluster configuration (type: {KUBERNETES_CLUSTER_TYPE})")
-    else:
-        # Auto mode but not localhost - assume external cluster
-        print(f"Auto-detected cluster type (server: {configuration.host})")
+        # Get the configuration to check the server URL
+        configuration = Configuration.get_default_copy()
+    
+        # Determine if we should apply KinD patches
+        # Check if explicitly set to kind, or auto-detect by checking if server is localhost
+        is_explicit_kind = KUBERNETES_CLUSTER_TYPE == "kind"
+        is_explicit_kind_flag = os.getenv("KIND_CLUSTER", "").lower() == "true"
+        is_localhost = configuration.host and ('127.0.0.1' in configuration.host or 'localhost' in configuration.host)
+    
+        should_patch_kind = (
+            is_explicit_kind or 
+            (KUBERNETES_CLUSTER_TYPE == "auto" and (is_explicit_kind_flag or is_localhost))
+        )
+    
+        if should_patch_kind:
+            # Check if we're running inside Docker
+            # Only patch to host.docker.internal if running inside Docker
+            running_in_docker = os.path.exists('/.dockerenv') or os.environ.get('DOCKER_CONTAINER') == 'true'
+        
+            # Patch configuration for Docker: replace 127.0.0.1 with host.docker.internal
+            # and disable SSL verification for development (kind uses self-signed certs)
+            import urllib3
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        
+            if configuration.host and ('127.0.0.1' in configuration.host or 'localhost' in configuration.host):
+                if running_in_docker:
+                    # Replace both 127.0.0.1 and localhost with host.docker.internal (only when in Docker)
+                    configuration.host = configuration.host.replace('127.0.0.1', 'host.docker.internal')
+                    configuration.host = configuration.host.replace('localhost', 'host.docker.internal')
+                    logger.info("Applied KinD-specific configuration patches (localhost -> host.docker.internal) for Docker")
+                else:
+                    # Running locally, keep localhost but disable SSL verification for KinD
+                    logger.info("Running locally, using localhost for KinD cluster")
+            
+                # Disable SSL verification for development (kind uses self-signed certs)
+                configuration.verify_ssl = False
+                Configuration.set_default(configuration)
+        elif KUBERNETES_CLUSTER_TYPE in ("eks", "external"):
+            # For external clusters (EKS, etc.), use standard configuration
+            logger.info("Using external Kubernetes cluster configuration (type: %s)", KUBERNETES_CLUSTER_TYPE)
+        else:
+            # Auto mode but not localhost - assume external cluster
+            logger.info("Auto-detected cluster type (server: %s)", configuration.host)
+
+
+configure_kubernetes()
+
+
+# Request bodies are read-only once parsed
+REQUEST_MODEL_CONFIG = ConfigDict(extra="ignore", frozen=True)
+
 
 class TaskSubmitRequest(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+    
     pythonCode: str = "print('Processing task in Kind...')"
     dependencies: str | None = None  # Space or comma-separated package names
     requirementsFile: str | None = None  # requirements.txt content
     taskId: str | None = None  # Optional: task ID for rerun (creates new run of existing task)
 
 
+class Position(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+    
+    x: float
+    y: float
+
+
 class FlowStepRequest(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+    
     id: str
     name: str
     pythonCode: str
     dependencies: str | None = None
     requirementsFile: str | None = None
-    position: dict  # {"x": number, "y": number}
+    position: Position
 
 
 class FlowEdgeRequest(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+    
     id: str
     source: str
     target: str
@@ -145,6 +219,8 @@ class FlowEdgeRequest(BaseModel):
 
 
 class FlowCreateRequest(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+    
     name: str
     description: str | None = None
     steps: list[FlowStepRequest]
@@ -152,6 +228,8 @@ class FlowCreateRequest(BaseModel):
 
 
 class FlowUpdateRequest(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+    
     name: str | None = None
     description: str | None = None
     steps: list[FlowStepRequest] | None = None
@@ -163,14 +241,21 @@ class PersistentPVPod:
     """Manages a persistent pod for fast PV file operations."""
     
     def __init__(self):
-        self.pod_name = f"pv-persistent-{uuid.uuid4().hex[:8]}"
-        self.namespace = os.getenv("ARGO_NAMESPACE", "argo")
+        # One pod per backend replica, named after the replica's own pod (HOSTNAME) so a restarted
+        # container picks up its existing pod (create_pod reuses it); the PID is 1 in every replica
+        self.pod_name = os.getenv("PV_POD_NAME", f"pv-persistent-{os.getenv('HOSTNAME') or socket.gethostname()}".lower())
+        self.namespace = ARGO_NAMESPACE
         self.core_api = None
         self._pod_ready = False
+        # PV_WORKER_SCRIPT exec stream, started on first call; one request at a time
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._pod_lock = threading.Lock()
         
     def initialize(self):
         """Initialize Kubernetes API client."""
-        self.core_api = CoreV1Api()
+        # REST calls only; execs each get their own client from _exec_api
+        self.core_api = CoreV1Api(k8s_api_client())
         
     def create_pod(self):
         """Create the persistent pod."""
@@ -182,7 +267,7 @@ class PersistentPVPod:
             try:
                 existing = self.core_api.read_namespaced_pod(name=self.pod_name, namespace=self.namespace)
                 if existing.status.phase in ["Running", "Pending"]:
-                    print(f"Persistent PV pod {self.pod_name} already exists")
+                    logger.info("Persistent PV pod %s already exists", self.pod_name)
                     self._pod_ready = True
                     return
             except Exception:
@@ -223,110 +308,233 @@ class PersistentPVPod:
             }
             
             self.core_api.create_namespaced_pod(namespace=self.namespace, body=pod_manifest)
-            print(f"Created persistent PV pod: {self.pod_name}")
-            
-            # Wait for pod to be ready
-            import time
-            max_wait = 60
-            waited = 0
-            while waited < max_wait:
-                try:
-                    pod = self.core_api.read_namespaced_pod(name=self.pod_name, namespace=self.namespace)
-                    if pod.status.phase == "Running":
-                        # Check if container is ready
-                        if pod.status.container_statuses:
-                            if pod.status.container_statuses[0].ready:
-                                self._pod_ready = True
-                                print(f"Persistent PV pod {self.pod_name} is ready")
-                                return
-                except Exception as e:
-                    pass
-                time.sleep(1)
-                waited += 1
+            logger.info("Created persistent PV pod: %s", self.pod_name)
+            
+            # Wait for pod to be ready: watch this one pod and return on the first ready event
+            pod_watch = watch.Watch()
+            for event in pod_watch.stream(
+                self.core_api.list_namespaced_pod,
+                namespace=self.namespace,
+                field_selector=f"metadata.name={self.pod_name}",
+                timeout_seconds=60
+            ):
+                if self._is_ready(event["object"]):
+                    pod_watch.stop()
+                    self._pod_ready = True
+                    logger.info("Persistent PV pod %s is ready", self.pod_name)
+                    return
             
             raise Exception(f"Pod {self.pod_name} did not become ready in time")
             
         except Exception as e:
-            print(f"Error creating persistent PV pod: {e}")
+            logger.error("Error creating persistent PV pod: %s", e)
             self._pod_ready = False
             raise
     
+    @staticmethod
+    def _is_ready(pod) -> bool:
+        """Pod is running and its container reports ready."""
+        status = pod.status
+        return bool(
+            status and status.phase == "Running" and
+            status.container_statuses and status.container_statuses[0].ready
+        )
+    
     def ensure_ready(self):
         """Ensure pod is ready, recreate if needed."""
-        if not self._pod_ready or not self.core_api:
-            self.create_pod()
-            return
+        # One check (and at most one recreate) at a time across request threads
+        with self._pod_lock:
+            if not self._pod_ready or not self.core_api:
+                self.create_pod()
+                return
         
-        # Check if pod is still running
-        try:
-            pod = self.core_api.read_namespaced_pod(name=self.pod_name, namespace=self.namespace)
-            if pod.status.phase != "Running" or not (pod.status.container_statuses and pod.status.container_statuses[0].ready):
-                print(f"Persistent PV pod {self.pod_name} is not ready, recreating...")
+            # Check if pod is still running
+            try:
+                pod = self.core_api.read_namespaced_pod(name=self.pod_name, namespace=self.namespace)
+                if not self._is_ready(pod):
+                    logger.info("Persistent PV pod %s is not ready, recreating...", self.pod_name)
+                    self._pod_ready = False
+                    try:
+                        self.core_api.delete_namespaced_pod(name=self.pod_name, namespace=self.namespace)
+                    except:
+                        pass
+                    self.create_pod()
+            except Exception as e:
+                logger.error("Error checking pod status: %s, recreating...", e)
                 self._pod_ready = False
                 try:
                     self.core_api.delete_namespaced_pod(name=self.pod_name, namespace=self.namespace)
                 except:
                     pass
                 self.create_pod()
-        except Exception as e:
-            print(f"Error checking pod status: {e}, recreating...")
-            self._pod_ready = False
-            try:
-                self.core_api.delete_namespaced_pod(name=self.pod_name, namespace=self.namespace)
-            except:
-                pass
-            self.create_pod()
     
-    def exec_command(self, command: str) -> str:
-        """Execute a command in the persistent pod and return output."""
+    @staticmethod
+    def _exec_api() -> CoreV1Api:
+        """
+        CoreV1Api on a fresh ApiClient, for one exec. kubernetes.stream swaps call_api on the
+        client it is given until the call returns, so two execs sharing a client can leave one
+        of them with the other's websocket transport.
+        """
+        return CoreV1Api(ApiClient(Configuration.get_default_copy()))
+    
+    def write_file(self, dir_path: str, name: str, source: BinaryIO, size: int) -> None:
+        """
+        Write ``size`` bytes from ``source`` to dir_path/name in the pod. The file is streamed
+        as a one-member tar archive into `tar x` over the exec stdin channel, so the bytes
+        cross the connection once, unencoded, and are never held in memory whole.
+        """
         self.ensure_ready()
-        
+        resp = stream(
+            self._exec_api().connect_get_namespaced_pod_exec,
+            self.pod_name,
+            self.namespace,
+            # dir_path is an argument, not part of the script; tar exits at the end-of-archive marker
+            command=["sh", "-c", 'mkdir -p "$1" && exec tar xmf - -C "$1"', "sh", dir_path],
+            stderr=True,
+            stdin=True,
+            stdout=True,
+            tty=False,
+            _preload_content=False
+        )
         try:
-            # Execute command using stream API
-            resp = stream(
-                self.core_api.connect_get_namespaced_pod_exec,
-                self.pod_name,
-                self.namespace,
-                command=["sh", "-c", command],
-                stderr=True,
-                stdin=False,
-                stdout=True,
-                tty=False
-            )
-            # Stream API returns string directly
-            return resp if isinstance(resp, str) else resp.decode('utf-8') if isinstance(resp, bytes) else str(resp)
-        except Exception as e:
-            # If exec fails, pod might be dead, try to recreate
-            print(f"Error executing command in pod: {e}, attempting to recreate pod...")
-            self._pod_ready = False
-            try:
-                self.core_api.delete_namespaced_pod(name=self.pod_name, namespace=self.namespace)
-            except:
-                pass
-            self.create_pod()
-            # Retry once
-            resp = stream(
-                self.core_api.connect_get_namespaced_pod_exec,
-                self.pod_name,
-                self.namespace,
-                command=["sh", "-c", command],
-                stderr=True,
-                stdin=False,
-                stdout=True,
-                tty=False
-            )
-            return resp if isinstance(resp, str) else resp.decode('utf-8') if isinstance(resp, bytes) else str(resp)
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mode = 0o644
+            info.mtime = int(time.time())
+            # Stream mode writes 1 MB frames to stdin as the upload is read, never seeking
+            with tarfile.open(fileobj=_ExecStdin(resp), mode="w|", bufsize=1 << 20) as archive:
+                archive.addfile(info, source)
+            resp.run_forever(timeout=120)
+            if resp.is_open():
+                raise RuntimeError(f"tar did not finish writing {name}")
+            if resp.returncode != 0:
+                raise RuntimeError(f"tar exited with {resp.returncode}: {resp.read_stderr().strip()}")
+        finally:
+            resp.close()
+    
+    def read_file(self, path: str) -> Iterator[bytes]:
+        """
+        Stream the raw bytes of a file in the pod through `cat`, chunk by chunk as they arrive.
+        Raises FileNotFoundError or IsADirectoryError before returning, so callers can still
+        answer with an error status.
+        """
+        self.ensure_ready()
+        resp = stream(
+            self._exec_api().connect_get_namespaced_pod_exec,
+            self.pod_name,
+            self.namespace,
+            command=["sh", "-c", 'test -e "$1" || exit 2; test -d "$1" && exit 3; exec cat "$1"', "sh", path],
+            stderr=True,
+            stdin=False,
+            stdout=True,
+            tty=False,
+            binary=True,
+            _preload_content=False
+        )
+        try:
+            # Wait for the first bytes or the exit status
+            first = b""
+            while resp.is_open() and not first:
+                first = resp.read_stdout(timeout=5)
+            first = first or resp.read_stdout()
+            if not first and resp.returncode == 2:
+                raise FileNotFoundError(f"File does not exist: {path}")
+            if not first and resp.returncode == 3:
+                raise IsADirectoryError(f"Path is a directory: {path}")
+        except BaseException:
+            resp.close()
+            raise
+        return self._stdout_chunks(resp, first)
+    
+    @staticmethod
+    def _stdout_chunks(resp, first: bytes) -> Iterator[bytes]:
+        try:
+            if first:
+                yield first
+            while resp.is_open():
+                chunk = resp.read_stdout(timeout=5)
+                if chunk:
+                    yield chunk
+            rest = resp.read_stdout()
+            if rest:
+                yield rest
+        finally:
+            resp.close()
+    
+    def _start_worker(self):
+        self.ensure_ready()
+        return stream(
+            self._exec_api().connect_get_namespaced_pod_exec,
+            self.pod_name,
+            self.namespace,
+            command=["python3", "-u", "-c", PV_WORKER_SCRIPT],
+            stderr=True,
+            stdin=True,
+            stdout=True,
+            tty=False,
+            _preload_content=False
+        )
+    
+    def call(self, op: str, **args) -> dict:
+        """
+        Run one PV_WORKER_SCRIPT operation and return its JSON reply. The worker stays up
+        between calls, so a request costs a line each way instead of an exec and a Python start.
+        A dead or unresponsive worker is replaced and the request retried once.
+        """
+        request = dump_json({"op": op, "args": args}) + "\n"
+        with self._worker_lock:
+            for _ in range(2):
+                if self._worker is None or not self._worker.is_open():
+                    self._worker = self._start_worker()
+                try:
+                    self._worker.write_stdin(request)
+                    line = self._worker.readline_stdout(timeout=PV_WORKER_TIMEOUT)
+                    # The reply has been read off the channel; drop the client's capture of it
+                    self._worker.read_all()
+                except Exception as e:
+                    logger.warning("PV worker request failed: %s", e)
+                    line = ""
+                if line:
+                    reply = load_json(line)
+                    if "failure" in reply:
+                        raise RuntimeError(reply["failure"])
+                    return reply
+                self._worker.close()
+                self._worker = None
+        raise RuntimeError(f"PV worker did not answer {op}")
+    
+    async def call_async(self, op: str, **args) -> dict:
+        """Run call in a worker thread so the event loop is not blocked."""
+        return await asyncio.to_thread(self.call, op, **args)
     
     def cleanup(self):
         """Clean up the persistent pod."""
         if not self.core_api:
             return
+        
+        if self._worker is not None:
+            self._worker.close()
+            self._worker = None
             
         try:
             self.core_api.delete_namespaced_pod(name=self.pod_name, namespace=self.namespace)
-            print(f"Cleaned up persistent PV pod: {self.pod_name}")
+            logger.info("Cleaned up persistent PV pod: %s", self.pod_name)
         except Exception as e:
-            print(f"Error cleaning up persistent PV pod: {e}")
+            logger.error("Error cleaning up persistent PV pod: %s", e)
+
+
+class _ExecStdin:
+    """File-like writer that forwards bytes to an exec stream's stdin channel."""
+    
+    def __init__(self, resp):
+        self.resp = resp
+    
+    def write(self, data: bytes) -> None:
+        self.resp.write_stdin(bytes(data))
+
+
+# Seconds to wait for a PV worker reply before the worker is restarted
+PV_WORKER_TIMEOUT = int(os.getenv("PV_WORKER_TIMEOUT", "60"))
 
 
 # Global persistent pod instance
@@ -342,139 +550,367 @@ def get_persistent_pv_pod() -> PersistentPVPod:
     return _persistent_pv_pod
 
 
+# Workflow CR + pod list per workflow, shared by every poller for a couple of seconds
+K8S_STATE_CACHE_TTL = float(os.getenv("K8S_STATE_CACHE_TTL", "2"))
+_WORKFLOW_STATE_CACHE_MAX = 1024
+_workflow_state_cache: dict[tuple[str, str], tuple[float, dict, list | None]] = {}
+_workflow_state_locks: dict[tuple[str, str], threading.Lock] = {}
+_workflow_state_guard = threading.Lock()
+
+
+def get_cached_workflow_state(workflow_id: str, namespace: str, include_pods: bool = False) -> tuple[dict, list]:
+    """
+    Return (workflow, pods) for an Argo workflow, reusing results younger than
+    K8S_STATE_CACHE_TTL seconds. Concurrent callers for the same workflow wait for
+    a single fetch. The workflow comes from the informer when it has synced and
+    knows the name; otherwise it is read from the API. Pods are only listed when
+    include_pods is set.
+    """
+    key = (namespace, workflow_id)
+    with _workflow_state_guard:
+        lock = _workflow_state_locks.setdefault(key, threading.Lock())
+    
+    with lock:
+        entry = _workflow_state_cache.get(key)
+        if entry and time.monotonic() - entry[0] < K8S_STATE_CACHE_TTL:
+            fetched_at, workflow, pods = entry
+        else:
+            fetched_at = time.monotonic()
+            workflow = None
+            if namespace == workflow_informer.namespace and workflow_informer.synced:
+                workflow = workflow_informer.get(workflow_id)
+            if workflow is None:
+                # Informer not synced yet, another namespace, or a workflow newer than its last event
+                workflow = CustomObjectsApi(k8s_api_client()).get_namespaced_custom_object(
+                    group="argoproj.io",
+                    version="v1alpha1",
+                    namespace=namespace,
+                    plural="workflows",
+                    name=workflow_id
+                )
+            pods = None
+        
+        if include_pods and pods is None:
+            try:
+                # resource_version="0" lets the API server answer from its watch cache
+                pods = CoreV1Api(k8s_api_client()).list_namespaced_pod(
+                    namespace=namespace,
+                    label_selector=f"workflows.argoproj.io/workflow={workflow_id}",
+                    resource_version="0"
+                ).items
+            except Exception:
+                pods = None
+        
+        _workflow_state_cache[key] = (fetched_at, workflow, pods)
+    
+    if len(_workflow_state_cache) > _WORKFLOW_STATE_CACHE_MAX:
+        with _workflow_state_guard:
+            cutoff = time.monotonic() - K8S_STATE_CACHE_TTL
+            for stale_key in [k for k, v in _workflow_state_cache.items() if v[0] < cutoff]:
+                _workflow_state_cache.pop(stale_key, None)
+                _workflow_state_locks.pop(stale_key, None)
+    
+    return workflow, pods or []
+
+
+class WorkflowInformer:
+    """
+    In-memory copy of the Argo workflows in one namespace, kept current by a list +
+    watch on a background thread. Lets list endpoints read workflow status without
+    one API call per task. Only metadata and status are kept (spec holds the code).
+    Listeners registered for a workflow name are called (on the watch thread) whenever
+    that workflow changes.
+    """
+    
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._workflows: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._stopping = threading.Event()
+        self._watch: watch.Watch | None = None
+        self._thread: threading.Thread | None = None
+        self._listeners: dict[str, set] = {}
+    
+    def start(self):
+        """Start the watch thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="workflow-informer", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stopping.set()
+        if self._watch:
+            self._watch.stop()
+    
+    @property
+    def synced(self) -> bool:
+        """True once a full list has been loaded and the watch is keeping it current."""
+        return self._synced.is_set()
+    
+    def get(self, name: str) -> dict | None:
+        with self._lock:
+            return self._workflows.get(name)
+    
+    def add_listener(self, name: str, callback) -> None:
+        with self._lock:
+            self._listeners.setdefault(name, set()).add(callback)
+    
+    def remove_listener(self, name: str, callback) -> None:
+        with self._lock:
+            callbacks = self._listeners.get(name)
+            if callbacks:
+                callbacks.discard(callback)
+                if not callbacks:
+                    del self._listeners[name]
+    
+    def _notify(self, names) -> None:
+        for name in names:
+            # Readers must not get a cached copy older than this event
+            _workflow_state_cache.pop((self.namespace, name), None)
+            with self._lock:
+                callbacks = list(self._listeners.get(name, ()))
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.warning("Workflow listener for %s failed: %s", name, e)
+    
+    @staticmethod
+    def _slim(workflow: dict) -> dict:
+        return {"metadata": workflow.get("metadata", {}), "status": workflow.get("status", {})}
+    
+    def _relist(self, api) -> str:
+        result = api.list_namespaced_custom_object(
+            group="argoproj.io",
+            version="v1alpha1",
+            namespace=self.namespace,
+            plural="workflows"
+        )
+        workflows = {item["metadata"]["name"]: self._slim(item) for item in result.get("items", [])}
+        with self._lock:
+            self._workflows = workflows
+            watched = list(self._listeners)
+        self._synced.set()
+        # Events may have been missed while the watch was down
+        self._notify(watched)
+        return result["metadata"]["resourceVersion"]
+    
+    def _run(self):
+        api = CustomObjectsApi(k8s_api_client())
+        resource_version = None
+        while not self._stopping.is_set():
+            try:
+                if resource_version is None:
+                    resource_version = self._relist(api)
+                self._watch = watch.Watch()
+                for event in self._watch.stream(
+                    api.list_namespaced_custom_object,
+                    group="argoproj.io",
+                    version="v1alpha1",
+                    namespace=self.namespace,
+                    plural="workflows",
+                    resource_version=resource_version,
+                    timeout_seconds=300
+                ):
+                    workflow = event["object"]
+                    name = workflow["metadata"]["name"]
+                    with self._lock:
+                        if event["type"] == "DELETED":
+                            self._workflows.pop(name, None)
+                        else:
+                            self._workflows[name] = self._slim(workflow)
+                    self._notify((name,))
+                    resource_version = workflow["metadata"].get("resourceVersion", resource_version)
+            except ApiException as e:
+                if e.status == 410:
+                    # Our resourceVersion has been compacted away; start over from a fresh list
+                    resource_version = None
+                    continue
+                logger.warning("Workflow informer error: %s; retrying", e)
+                self._synced.clear()
+                resource_version = None
+                self._stopping.wait(5)
+            except Exception as e:
+                logger.warning("Workflow informer error: %s; retrying", e)
+                self._synced.clear()
+                resource_version = None
+                self._stopping.wait(5)
+
+
+workflow_informer = WorkflowInformer(ARGO_NAMESPACE)
+
+
+# Pod log reads for one workflow are issued in parallel; total latency is the slowest pod, not the sum
+K8S_LOG_FETCH_WORKERS = int(os.getenv("K8S_LOG_FETCH_WORKERS", "8"))
+_pod_log_executor = ThreadPoolExecutor(max_workers=K8S_LOG_FETCH_WORKERS, thread_name_prefix="pod-logs")
+
+
+# Per-pod log tails already read from the API server, keyed by (namespace, pod name).
+# Later refreshes only ask for lines newer than the last one seen (since_seconds plus a
+# timestamp check), and pods that had finished when last read are not fetched again.
+POD_LOG_TAIL_LINES = 1000
+_POD_LOG_CACHE_MAX = 256
+_pod_log_cache: dict[tuple[str, str], dict] = {}
+_pod_log_cache_lock = threading.Lock()
+
+
+def _log_timestamp_key(timestamp: str) -> str:
+    """Normalise an RFC3339Nano timestamp (trailing zeros trimmed) so it sorts as a string."""
+    seconds, _, fraction = timestamp.rstrip("Z").partition(".")
+    return f"{seconds}.{fraction.ljust(9, '0')}"
+
+
+def read_pod_log_tail(core_api, pod_name: str, namespace: str, pod_finished: bool = False) -> str:
+    """Return the last POD_LOG_TAIL_LINES lines of a pod's main container, fetching only new lines."""
+    key = (namespace, pod_name)
+    with _pod_log_cache_lock:
+        cached = _pod_log_cache.get(key)
+        if cached and cached["finished"]:
+            return cached["text"]
+    
+    request_kwargs = {"tail_lines": POD_LOG_TAIL_LINES}
+    if cached:
+        # A couple of seconds of overlap; lines already seen are dropped by timestamp below
+        request_kwargs = {"since_seconds": int(time.monotonic() - cached["fetched_at"]) + 2}
+    fetched_at = time.monotonic()
+    raw = core_api.read_namespaced_pod_log(
+        name=pod_name,
+        namespace=namespace,
+        container="main",
+        timestamps=True,
+        **request_kwargs
+    )
+    
+    with _pod_log_cache_lock:
+        # Re-read: another request may have merged newer lines while this one was in flight
+        cached = _pod_log_cache.get(key)
+        lines = list(cached["lines"]) if cached else []
+        # Everything before the previous fetch's newest timestamp was already kept. Lines
+        # carrying exactly that timestamp are repeated (in order) by the overlap, and are only
+        # new once they go past the ones already seen.
+        cutoff = cached["last_seen"] if cached else ""
+        seen_at_cutoff = cached["at_last_seen"] if cached else []
+        repeated = 0
+        last_seen, at_last_seen = cutoff, list(seen_at_cutoff)
+        for line in (raw or "").splitlines():
+            timestamp, _, content = line.partition(" ")
+            timestamp_key = _log_timestamp_key(timestamp)
+            if timestamp_key < cutoff:
+                continue
+            if timestamp_key == cutoff and repeated < len(seen_at_cutoff) and content == seen_at_cutoff[repeated]:
+                repeated += 1
+                continue
+            lines.append(content)
+            if timestamp_key > last_seen:
+                last_seen, at_last_seen = timestamp_key, [content]
+            else:
+                at_last_seen.append(content)
+        lines = lines[-POD_LOG_TAIL_LINES:]
+        text_out = "\n".join(lines) + "\n" if lines else ""
+        if cached is None and len(_pod_log_cache) >= _POD_LOG_CACHE_MAX:
+            _pod_log_cache.pop(next(iter(_pod_log_cache)), None)
+        _pod_log_cache[key] = {
+            "fetched_at": fetched_at,
+            "last_seen": last_seen,
+            "at_last_seen": at_last_seen,
+            "lines": lines,
+            "text": text_out,
+            "finished": pod_finished,
+        }
+    return text_out
+
+
 def fetch_logs_from_kubernetes(task_id: str, namespace: str | None = None) -> list:
     """
     Fetch logs directly from Kubernetes pods.
     Returns a list of log entries with structure: {node, pod, phase, logs}
     """
-    if namespace is None:
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
+    namespace = namespace or ARGO_NAMESPACE
     
-    core_api = CoreV1Api()
-    custom_api = CustomObjectsApi()
+    core_api = CoreV1Api(k8s_api_client())
     
     try:
-        # Get workflow to find pod names
-        workflow = custom_api.get_namespaced_custom_object(
-            group="argoproj.io",
-            version="v1alpha1",
-            namespace=namespace,
-            plural="workflows",
-            name=task_id
-        )
+        # Get workflow to find pod names, and list its pods once to match them to nodes
+        workflow, pods = get_cached_workflow_state(task_id, namespace, include_pods=True)
         
         status = workflow.get("status", {})
         nodes = status.get("nodes", {})
         
         # Get the workflow's overall phase to use for log entries
         workflow_phase = determine_workflow_phase(status)
+        workflow_is_terminal = workflow_phase in TERMINAL_PHASES
+        
+        # Only get logs from Pod nodes
+        pod_nodes = [(node_id, node_info) for node_id, node_info in nodes.items() if node_info.get("type", "") == "Pod"]
         
-        # Collect logs from all nodes (pods) in the workflow
-        all_logs = []
+        # Match pods to nodes by Argo's node-id annotation
+        pods_by_node = {}
+        for pod in pods:
+            node_annotation = (pod.metadata.annotations or {}).get("workflows.argoproj.io/node-id")
+            if node_annotation:
+                pods_by_node[node_annotation] = pod
+            pods_by_node.setdefault(pod.metadata.name, pod)
         
-        for node_id, node_info in nodes.items():
-            node_type = node_info.get("type", "")
+        def fetch_node_logs(node: tuple) -> dict | None:
+            node_id, node_info = node
             node_phase = node_info.get("phase", "")
             
             # Use workflow phase if workflow is completed, otherwise use node phase
             # This ensures log entries show the correct phase when workflow transitions
-            if workflow_phase in ["Succeeded", "Failed", "Error"]:
-                phase = workflow_phase
-            else:
-                phase = node_phase or "Pending"
+            phase = workflow_phase if workflow_is_terminal else (node_phase or "Pending")
             
-            # Only get logs from Pod nodes
-            if node_type == "Pod":
-                # Try different ways to get the pod name
-                pod_name = (
-                    node_info.get("displayName") or 
-                    node_info.get("id") or 
-                    node_id
-                )
+            # Try different ways to get the pod name
+            pod_name = (
+                node_info.get("displayName") or 
+                node_info.get("id") or 
+                node_id
+            )
+            actual_pod = (
+                pods_by_node.get(node_id) or
+                pods_by_node.get(pod_name) or
+                (pods[0] if len(pods) == 1 else None)
+            )
+            
+            pod_phase = None
+            try:
+                # Check if pod is ready before trying to fetch logs
+                if actual_pod:
+                    pod_name = actual_pod.metadata.name
+                    pod_phase = actual_pod.status.phase if actual_pod.status else None
+                    # If pod is still initializing or pending, skip log fetch (not an error)
+                    if pod_phase in ["Pending"]:
+                        # Pod is still starting - this is normal, don't add error
+                        return None
                 
-                try:
-                    # First, try to get the actual pod to check its status
-                    actual_pod = None
-                    try:
-                        # Try to find the pod by label selector first
-                        label_selector = f"workflows.argoproj.io/workflow={task_id}"
-                        pods = core_api.list_namespaced_pod(
-                            namespace=namespace,
-                            label_selector=label_selector
-                        )
-                        
-                        if pods.items:
-                            actual_pod = pods.items[0]
-                            pod_name = actual_pod.metadata.name
-                    except:
-                        pass
-                    
-                    # Check if pod is ready before trying to fetch logs
-                    if actual_pod:
-                        pod_phase = actual_pod.status.phase if actual_pod.status else None
-                        # If pod is still initializing or pending, skip log fetch (not an error)
-                        if pod_phase in ["Pending"]:
-                            # Pod is still starting - this is normal, don't add error
-                            continue
-                    
-                    # Try to fetch logs
-                    try:
-                        logs = core_api.read_namespaced_pod_log(
-                            name=pod_name,
-                            namespace=namespace,
-                            container="main",
-                            tail_lines=1000
-                        )
-                    except Exception as log_error:
-                        # Check if it's a "PodInitializing" or "waiting to start" error
-                        error_str = str(log_error)
-                        if "PodInitializing" in error_str or "waiting to start" in error_str:
-                            # Pod is still initializing - this is normal, skip silently
-                            continue
-                        # If that fails and we don't have the pod yet, try to find it
-                        if not actual_pod:
-                            label_selector = f"workflows.argoproj.io/workflow={task_id}"
-                            pods = core_api.list_namespaced_pod(
-                                namespace=namespace,
-                                label_selector=label_selector
-                            )
-                            
-                            if pods.items:
-                                actual_pod = pods.items[0]
-                                actual_pod_name = actual_pod.metadata.name
-                                # Check pod phase again
-                                pod_phase = actual_pod.status.phase if actual_pod.status else None
-                                if pod_phase in ["Pending"]:
-                                    continue
-                                
-                                logs = core_api.read_namespaced_pod_log(
-                                    name=actual_pod_name,
-                                    namespace=namespace,
-                                    container="main",
-                                    tail_lines=1000
-                                )
-                                pod_name = actual_pod_name
-                            else:
-                                raise Exception("No pods found for workflow")
-                        else:
-                            raise log_error
-                    
-                    all_logs.append({
-                        "node": node_id,
-                        "pod": pod_name,
-                        "phase": phase,
-                        "logs": logs
-                    })
-                except Exception as e:
-                    error_str = str(e)
-                    # Only add error message for actual errors, not for pods that are still starting
-                    if "PodInitializing" not in error_str and "waiting to start" not in error_str:
-                        all_logs.append({
-                            "node": node_id,
-                            "pod": pod_name,
-                            "phase": phase,
-                            "logs": f"Error fetching logs: {str(e)}"
-                        })
+                logs = read_pod_log_tail(
+                    core_api,
+                    pod_name,
+                    namespace,
+                    pod_finished=pod_phase in ("Succeeded", "Failed")
+                )
+                return {
+                    "node": node_id,
+                    "pod": pod_name,
+                    "phase": phase,
+                    "logs": logs
+                }
+            except Exception as e:
+                error_str = str(e)
+                # Only add error message for actual errors, not for pods that are still starting
+                if "PodInitializing" in error_str or "waiting to start" in error_str:
+                    return None
+                return {
+                    "node": node_id,
+                    "pod": pod_name,
+                    "phase": phase,
+                    "logs": f"Error fetching logs: {str(e)}"
+                }
+        
+        # Collect logs from all nodes (pods) in the workflow, keeping node order
+        all_logs = [entry for entry in _pod_log_executor.map(fetch_node_logs, pod_nodes) if entry]
         
         # If no pod logs found, try to get workflow-level messages
         if not all_logs:
@@ -492,45 +928,82 @@ def fetch_logs_from_kubernetes(task_id: str, namespace: str | None = None) -> li
         raise Exception(f"Error fetching logs from Kubernetes: {str(e)}")
 
 
+# Hot lookups built once at import; reusing the same statement objects keeps them
+# on SQLAlchemy's compiled-statement cache fast path instead of rebuilding per request
+TASK_LOGS_BY_RUN = select(TaskLog).where(TaskLog.run_id == bindparam("run_id")).order_by(TaskLog.created_at)
+# Brings every stored log row of a run to the run's final phase
+TASK_LOG_PHASES_BY_RUN = (
+    update(TaskLog)
+    .where(TaskLog.run_id == bindparam("for_run_id"), TaskLog.phase != bindparam("new_phase"))
+    .values(phase=bindparam("new_phase"))
+)
+# populate_existing: long-lived sessions (WebSocket) must see rows the log batcher rewrote
+TASK_LOG_BODIES_BY_RUN = TASK_LOGS_BY_RUN.options(undefer(TaskLog.logs)).execution_options(populate_existing=True)
+LATEST_TASK_RUN = select(TaskRun).where(TaskRun.task_id == bindparam("task_id")).order_by(TaskRun.run_number.desc()).limit(1)
+LATEST_FLOW_RUN = select(FlowRun).where(FlowRun.flow_id == bindparam("flow_id")).order_by(FlowRun.run_number.desc()).limit(1)
+_RANKED_TASK_RUNS = select(
+    TaskRun.id,
+    func.row_number().over(partition_by=TaskRun.task_id, order_by=TaskRun.run_number.desc()).label("run_rank")
+).where(TaskRun.task_id.in_(bindparam("task_ids", expanding=True))).subquery()
+LATEST_TASK_RUNS = select(TaskRun).join(_RANKED_TASK_RUNS, TaskRun.id == _RANKED_TASK_RUNS.c.id).where(_RANKED_TASK_RUNS.c.run_rank == 1)
+# get_task's ETag version: the task's updated_at plus each run's state (newest first), no code columns
+TASK_VERSION = (
+    select(Task.updated_at, TaskRun.id, TaskRun.phase, TaskRun.started_at, TaskRun.finished_at)
+    .outerjoin(TaskRun, TaskRun.task_id == Task.id)
+    .where(Task.id == bindparam("task_id"))
+    .order_by(TaskRun.run_number.desc())
+)
+# Legacy (task_id keyed) task_logs reads
+LEGACY_TASK_LOGS_BY_WORKFLOW = text("""
+    SELECT DISTINCT tl.node_id, tl.pod_name, tl.phase, tl.logs 
+    FROM task_logs tl
+    INNER JOIN task_runs tr ON tl.task_id = tr.task_id
+    WHERE tr.workflow_id = :workflow_id
+    AND (tl.pod_name LIKE :workflow_pattern OR tl.node_id = :workflow_id)
+    ORDER BY tl.created_at
+""")
+LEGACY_TASK_LOGS_BY_TASK = text("SELECT node_id, pod_name, phase, logs FROM task_logs WHERE task_id = :task_id ORDER BY created_at")
+
+
+def load_latest_runs(db: Session, task_ids: list[str]) -> dict[str, TaskRun]:
+    """Latest TaskRun per task for many tasks in one query, keyed by task_id."""
+    if not task_ids:
+        return {}
+    return {run.task_id: run for run in db.scalars(LATEST_TASK_RUNS, {"task_ids": task_ids})}
+
 def save_logs_to_database(run_id: int, logs: list, db: Session, task_id: str | None = None, workflow_id: str | None = None):
     """
     Save logs to database for a specific run. Updates existing entries or creates new ones.
     Handles both old schema (task_id) and new schema (run_id).
     """
     try:
-        from sqlalchemy import text, inspect
-        from app.database import engine
-        
-        # Check which schema we're using
-        inspector = inspect(engine)
-        task_logs_columns = [col['name'] for col in inspector.get_columns('task_logs')]
+        # Check which schema we're using (introspected once per process)
+        task_logs_columns = table_columns('task_logs')
         has_run_id = 'run_id' in task_logs_columns
         has_task_id = 'task_id' in task_logs_columns
         
+        if has_run_id:
+            # New schema: use run_id
+            rows = [
+                {
+                    "run_id": run_id,
+                    "node_id": log_entry["node"],
+                    "pod_name": log_entry["pod"],
+                    "phase": log_entry["phase"],
+                    "logs": log_entry["logs"]
+                }
+                for log_entry in logs
+            ]
+            # Hand off to the background batcher; write inline if it isn't running
+            if not log_batcher.enqueue(rows):
+                upsert_task_logs(db, rows)
+                db.commit()
+            return
+        
+        # One timestamp for the whole batch; these tables may predate the server-side defaults
+        now = datetime.utcnow()
         for log_entry in logs:
-            if has_run_id:
-                # New schema: use run_id
-                existing = db.query(TaskLog).filter(
-                    TaskLog.run_id == run_id,
-                    TaskLog.node_id == log_entry["node"],
-                    TaskLog.pod_name == log_entry["pod"]
-                ).first()
-                
-                if existing:
-                    # Update existing entry
-                    existing.logs = log_entry["logs"]
-                    existing.phase = log_entry["phase"]
-                else:
-                    # Create new entry
-                    db_log = TaskLog(
-                        run_id=run_id,
-                        node_id=log_entry["node"],
-                        pod_name=log_entry["pod"],
-                        phase=log_entry["phase"],
-                        logs=log_entry["logs"]
-                    )
-                    db.add(db_log)
-            elif has_task_id and task_id:
+            if has_task_id and task_id:
                 # Old schema: use task_id, but filter by workflow_id when checking/updating
                 # Join with task_runs to ensure we're working with logs for the correct run
                 if workflow_id:
@@ -561,12 +1034,11 @@ def save_logs_to_database(run_id: int, logs: list, db: Session, task_id: str | N
                                 "logs": log_entry["logs"], 
                                 "phase": log_entry["phase"], 
                                 "id": existing[0],
-                                "updated_at": datetime.utcnow()
+                                "updated_at": now
                             }
                         )
                     else:
                         # Create new entry (pod_name should be unique per workflow/run)
-                        now = datetime.utcnow()
                         db.execute(
                             text("INSERT INTO task_logs (task_id, node_id, pod_name, phase, logs, created_at, updated_at) VALUES (:task_id, :node_id, :pod_name, :phase, :logs, :created_at, :updated_at)"),
                             {
@@ -594,12 +1066,11 @@ def save_logs_to_database(run_id: int, logs: list, db: Session, task_id: str | N
                                 "logs": log_entry["logs"], 
                                 "phase": log_entry["phase"], 
                                 "id": existing[0],
-                                "updated_at": datetime.utcnow()
+                                "updated_at": now
                             }
                         )
                     else:
                         # Create new entry
-                        now = datetime.utcnow()
                         db.execute(
                             text("INSERT INTO task_logs (task_id, node_id, pod_name, phase, logs, created_at, updated_at) VALUES (:task_id, :node_id, :pod_name, :phase, :logs, :created_at, :updated_at)"),
                             {
@@ -614,16 +1085,47 @@ def save_logs_to_database(run_id: int, logs: list, db: Session, task_id: str | N
                         )
             else:
                 # Schema not migrated and no task_id provided - skip saving
-                print(f"Warning: Cannot save logs - schema not migrated and task_id not provided")
+                logger.warning("Cannot save logs - schema not migrated and task_id not provided")
                 continue
         
         db.commit()
     except Exception as e:
         db.rollback()
-        print(f"Error saving logs to database: {e}")
+        logger.error("Error saving logs to database: %s", e)
         # Don't raise - allow logs to still be returned from Kubernetes
 
 
+def save_logs_in_background(run_id: int, logs: list, task_id: str | None = None, workflow_id: str | None = None):
+    """
+    Background-task wrapper around save_logs_to_database.
+    Runs after the response is sent, so it opens its own session rather than using the request's.
+    """
+    db = SessionLocal()
+    try:
+        save_logs_to_database(run_id, logs, db, task_id=task_id, workflow_id=workflow_id)
+    finally:
+        db.close()
+
+
+def save_log_phase_in_background(run_id: int, phase: str, logs: list, task_id: str | None = None, workflow_id: str | None = None):
+    """
+    Background task: set the phase of a run's stored log rows with one UPDATE,
+    leaving the log bodies alone. Legacy task_logs tables without run_id are
+    rewritten through save_logs_to_database instead.
+    """
+    if 'run_id' not in table_columns('task_logs'):
+        save_logs_in_background(run_id, logs, task_id=task_id, workflow_id=workflow_id)
+        return
+    db = SessionLocal()
+    try:
+        db.execute(TASK_LOG_PHASES_BY_RUN, {"for_run_id": run_id, "new_phase": phase})
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error updating log phases in database: %s", e)
+    finally:
+        db.close()
+
 def get_logs_from_database(run_id: int, db: Session, task_id: str | None = None, workflow_id: str | None = None) -> list:
     """
     Fetch logs from database for a given run.
@@ -631,20 +1133,14 @@ def get_logs_from_database(run_id: int, db: Session, task_id: str | None = None,
     Returns a list of log entries with structure: {node, pod, phase, logs}
     """
     try:
-        from sqlalchemy import text, inspect
-        from app.database import engine
-        
-        # Check which schema we're using
-        inspector = inspect(engine)
-        task_logs_columns = [col['name'] for col in inspector.get_columns('task_logs')]
+        # Check which schema we're using (introspected once per process)
+        task_logs_columns = table_columns('task_logs')
         has_run_id = 'run_id' in task_logs_columns
         has_task_id = 'task_id' in task_logs_columns
         
         if has_run_id:
             # New schema: use run_id with ORM
-            db_logs = db.query(TaskLog).filter(
-                TaskLog.run_id == run_id
-            ).order_by(TaskLog.created_at).all()
+            db_logs = db.scalars(TASK_LOG_BODIES_BY_RUN, {"run_id": run_id}).all()
             
             return [
                 {
@@ -662,14 +1158,7 @@ def get_logs_from_database(run_id: int, db: Session, task_id: str | None = None,
                 # Join with task_runs to filter by workflow_id
                 # Also filter by pod_name pattern that matches the workflow_id to ensure we only get logs for this specific run
                 log_rows = db.execute(
-                    text("""
-                        SELECT DISTINCT tl.node_id, tl.pod_name, tl.phase, tl.logs 
-                        FROM task_logs tl
-                        INNER JOIN task_runs tr ON tl.task_id = tr.task_id
-                        WHERE tr.workflow_id = :workflow_id
-                        AND (tl.pod_name LIKE :workflow_pattern OR tl.node_id = :workflow_id)
-                        ORDER BY tl.created_at
-                    """),
+                    LEGACY_TASK_LOGS_BY_WORKFLOW,
                     {
                         "workflow_id": workflow_id,
                         "workflow_pattern": f"%{workflow_id}%"
@@ -678,16 +1167,17 @@ def get_logs_from_database(run_id: int, db: Session, task_id: str | None = None,
             else:
                 # Fallback: if no workflow_id, use task_id (will show all runs' logs)
                 log_rows = db.execute(
-                    text("SELECT node_id, pod_name, phase, logs FROM task_logs WHERE task_id = :task_id ORDER BY created_at"),
+                    LEGACY_TASK_LOGS_BY_TASK,
                     {"task_id": task_id}
                 ).fetchall()
             
+            # Both legacy statements select exactly node_id, pod_name, phase, logs
             return [
                 {
-                    "node": getattr(row, 'node_id', row[0] if len(row) > 0 else ""),
-                    "pod": getattr(row, 'pod_name', row[1] if len(row) > 1 else ""),
-                    "phase": getattr(row, 'phase', row[2] if len(row) > 2 else "Pending"),
-                    "logs": getattr(row, 'logs', row[3] if len(row) > 3 else "")
+                    "node": row.node_id,
+                    "pod": row.pod_name,
+                    "phase": row.phase,
+                    "logs": row.logs
                 }
                 for row in log_rows
             ]
@@ -695,7 +1185,7 @@ def get_logs_from_database(run_id: int, db: Session, task_id: str | None = None,
             # No matching schema or missing task_id
             return []
     except Exception as e:
-        print(f"Error fetching logs from database: {e}")
+        logger.error("Error fetching logs from database: %s", e)
         return []
 
 
@@ -739,17 +1229,19 @@ def extract_task_details(workflow_item: dict) -> dict:
         # Check for script template (tasks with dependencies)
         script = template.get("script", {})
         if script:
-            env = script.get("env", [])
-            # Extract Python code if not already found
-            if not python_code:
-                for env_var in env:
-                    if env_var.get("name") == "PYTHON_CODE":
-                        python_code = env_var.get("value", "")
-                        break
-            # Extract dependencies
-            for env_var in env:
-                if env_var.get("name") == "DEPENDENCIES":
+            # One pass over env for both variables (first match of each wins);
+            # Python code is only taken from env if the container had none
+            need_code = not python_code
+            need_dependencies = True
+            for env_var in script.get("env", []):
+                name = env_var.get("name")
+                if need_code and name == "PYTHON_CODE":
+                    python_code = env_var.get("value", "")
+                    need_code = False
+                elif need_dependencies and name == "DEPENDENCIES":
                     dependencies = env_var.get("value", "")
+                    need_dependencies = False
+                if not (need_code or need_dependencies):
                     break
     
     # Get workflow message/conditions for debugging
@@ -768,6 +1260,13 @@ def extract_task_details(workflow_item: dict) -> dict:
     }
 
 
+def parse_k8s_timestamp(value: str) -> datetime:
+    """Parse an RFC 3339 timestamp from a Kubernetes/Argo status ("...Z" means UTC)."""
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+
 def determine_workflow_phase(status: dict) -> str:
     """
     Determine the actual workflow phase by checking workflow status and node states.
@@ -782,7 +1281,7 @@ def determine_workflow_phase(status: dict) -> str:
         return "Pending"
     
     # If workflow is finished, return the final phase
-    if phase in ["Succeeded", "Failed", "Error"]:
+    if phase in TERMINAL_PHASES:
         return phase
     
     nodes = status.get("nodes", {})
@@ -793,56 +1292,39 @@ def determine_workflow_phase(status: dict) -> str:
             # No nodes yet means workflow is still pending
             return "Pending"
         
-        # Check pod node states
-        has_running_pod = False
+        # Single pass over pod nodes; a running pod settles it immediately
         has_pending_pod = False
         has_succeeded_pod = False
-        has_failed_pod = False
+        has_pod_node = False
         
-        for node_id, node_info in nodes.items():
-            node_type = node_info.get("type", "")
-            node_phase = node_info.get("phase", "")
-            
+        for node_info in nodes.values():
             # Only check Pod nodes (skip workflow-level nodes)
-            if node_type == "Pod":
-                if node_phase == "Running":
-                    has_running_pod = True
-                elif node_phase == "Succeeded":
-                    has_succeeded_pod = True
-                elif node_phase == "Failed" or node_phase == "Error":
-                    has_failed_pod = True
-                elif node_phase in ["Pending", ""]:
-                    has_pending_pod = True
-        
-        # If we have running pods, it's actually running
-        if has_running_pod:
-            return "Running"
+            if node_info.get("type") != "Pod":
+                continue
+            has_pod_node = True
+            node_phase = node_info.get("phase", "")
+            if node_phase == "Running":
+                return "Running"
+            if node_phase == "Succeeded":
+                has_succeeded_pod = True
+            elif node_phase in ("Pending", ""):
+                has_pending_pod = True
+        
         # If pods have succeeded but workflow hasn't updated yet, still show as running
-        # (workflow phase will update to Succeeded shortly)
-        elif has_succeeded_pod and not has_running_pod and not has_pending_pod:
-            # Pods completed but workflow phase hasn't updated yet - show as running
-            # This is a transitional state
+        # (workflow phase will update to Succeeded shortly) - this is a transitional state
+        if has_succeeded_pod and not has_pending_pod:
             return "Running"
         # If we only have pending pods or no pod nodes, it's pending
-        elif has_pending_pod or not any(n.get("type") == "Pod" for n in nodes.values()):
+        if has_pending_pod or not has_pod_node:
             return "Pending"
         # Otherwise, trust the workflow phase
-        else:
-            return phase
+        return phase
     
     # For other phases (like "Pending"), check if nodes exist and are running
     # This handles cases where workflow phase might lag behind node states
-    if nodes:
-        has_running_pod = False
-        for node_id, node_info in nodes.items():
-            node_type = node_info.get("type", "")
-            node_phase = node_info.get("phase", "")
-            if node_type == "Pod" and node_phase == "Running":
-                has_running_pod = True
-                break
-        
+    if nodes and phase == "Pending":
         # If we have running pods but workflow phase says pending, it's actually running
-        if has_running_pod and phase == "Pending":
+        if any(node_info.get("type") == "Pod" and node_info.get("phase") == "Running" for node_info in nodes.values()):
             return "Running"
     
     # Return the workflow phase as-is for other cases
@@ -858,32 +1340,7 @@ def create_and_submit_workflow(
     Helper function to create and submit an Argo Workflow using Hera SDK.
     Returns the workflow ID.
     """
-    # Check if PVC exists and is bound before creating workflow
-    core_api = CoreV1Api()
-    try:
-        pvc = core_api.read_namespaced_persistent_volume_claim(
-            name="task-results-pvc",
-            namespace=namespace
-        )
-        pvc_status = pvc.status.phase if pvc.status else "Unknown"
-        if pvc_status != "Bound":
-            raise HTTPException(
-                status_code=400, 
-                detail=f"PVC 'task-results-pvc' is not bound. Current status: {pvc_status}. Please ensure the PV is available."
-            )
-    except Exception as pvc_error:
-        # If PVC doesn't exist, that's also a problem
-        if "404" in str(pvc_error) or "Not Found" in str(pvc_error):
-            raise HTTPException(
-                status_code=400,
-                detail="PVC 'task-results-pvc' not found. Please create it first using: kubectl apply -f infrastructure/k8s/pv.yaml"
-            )
-        # Re-raise if it's our HTTPException
-        if isinstance(pvc_error, HTTPException):
-            raise pvc_error
-        # Otherwise log and continue (might be a transient issue)
-        print(f"Warning: Could not verify PVC status: {pvc_error}")
-    
+    # create_workflow_with_hera checks that the results PVC is bound (cached briefly)
     # Create workflow using Hera SDK
     workflow_id = create_workflow_with_hera(
         python_code=python_code,
@@ -901,8 +1358,12 @@ def create_and_submit_workflow(
     return workflow_id
 
 
+# Shell metacharacters rejected in the dependencies string (basic security check)
+DANGEROUS_DEPENDENCY_PATTERN = re.compile(r";|&&|\|\||`|\$\(")
+
+
 @app.post("/api/v1/tasks/submit")
-async def submit_task(request: TaskSubmitRequest = TaskSubmitRequest()):
+def submit_task(request: TaskSubmitRequest = TaskSubmitRequest(), db: Session = Depends(get_db)):
     """
     Submit a task to be saved in the database without running it.
     The task will have status 'Not Started' until it is explicitly run.
@@ -916,14 +1377,13 @@ async def submit_task(request: TaskSubmitRequest = TaskSubmitRequest()):
                     status_code=400,
                     detail="Dependencies string is too long (max 10000 characters)"
                 )
-            # Check for potentially dangerous patterns (basic security check)
-            dangerous_patterns = [';', '&&', '||', '`', '$(']
-            for pattern in dangerous_patterns:
-                if pattern in request.dependencies:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Invalid character in dependencies: {pattern}"
-                    )
+            # Check for potentially dangerous patterns in a single scan
+            match = DANGEROUS_DEPENDENCY_PATTERN.search(request.dependencies)
+            if match:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid character in dependencies: {match.group(0)}"
+                )
         
         if request.requirementsFile:
             # Basic validation for requirements file
@@ -934,7 +1394,6 @@ async def submit_task(request: TaskSubmitRequest = TaskSubmitRequest()):
                 )
         
         # Only save the task to database, don't create workflow yet
-        db = next(get_db())
         try:
             # Determine task_id: use provided taskId for rerun, or generate new one
             if request.taskId:
@@ -951,16 +1410,15 @@ async def submit_task(request: TaskSubmitRequest = TaskSubmitRequest()):
                 db.commit()
                 task_id = request.taskId
             else:
-                # New task: create Task record
-                task_id = f"task-{uuid.uuid4().hex[:12]}"
+                # New task: create Task record (Postgres generates the id)
                 task = Task(
-                    id=task_id,
                     python_code=request.pythonCode,
                     dependencies=request.dependencies if request.dependencies else None,
                     requirements_file=request.requirementsFile if request.requirementsFile else None
                 )
                 db.add(task)
                 db.commit()
+                task_id = task.id
             
             return {
                 "id": task_id,
@@ -971,60 +1429,41 @@ async def submit_task(request: TaskSubmitRequest = TaskSubmitRequest()):
             raise
         except Exception as db_error:
             db.rollback()
-            print(f"Error saving task to database: {db_error}")
+            logger.error("Error saving task to database: %s", db_error)
             raise HTTPException(status_code=500, detail=f"Failed to save task: {str(db_error)}")
-        finally:
-            db.close()
     except HTTPException:
         raise
     except Exception as e:
         # Print full error for debugging
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/v1/tasks/{task_id}/run")
-async def run_task(task_id: str):
+def run_task(task_id: str, db: Session = Depends(get_db)):
     """
     Execute a task that was previously saved.
     Creates the workflow and starts execution.
     """
     try:
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
+        namespace = ARGO_NAMESPACE
         
         # Load task from database
-        db = next(get_db())
         try:
             task = db.query(Task).filter(Task.id == task_id).first()
             if not task:
                 raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
             
             # Check if task already has a running workflow
-            from sqlalchemy import inspect as sql_inspect, text
-            from app.database import engine
-            inspector = sql_inspect(engine)
-            task_runs_columns = [col['name'] for col in inspector.get_columns('task_runs')]
-            has_python_code = 'python_code' in task_runs_columns
-            
-            if has_python_code:
-                latest_run = db.query(TaskRun).filter(
-                    TaskRun.task_id == task_id
-                ).order_by(TaskRun.run_number.desc()).first()
-            else:
-                result = db.execute(
-                    text("SELECT id, task_id, workflow_id, run_number, phase, started_at, finished_at, created_at FROM task_runs WHERE task_id = :task_id ORDER BY run_number DESC LIMIT 1"),
-                    {"task_id": task_id}
-                ).fetchone()
-                latest_run = result
+            latest_run = db.scalars(LATEST_TASK_RUN, {"task_id": task_id}).first()
             
             # Check if latest run is still running
             if latest_run:
-                latest_phase = latest_run.phase if has_python_code else (latest_run[4] if isinstance(latest_run, tuple) else latest_run.phase)
+                latest_phase = latest_run.phase
                 if latest_phase in ["Running", "Pending"]:
                     raise HTTPException(
                         status_code=400,
-                        detail=f"Task {task_id} already has a running workflow (run #{latest_run.run_number if has_python_code else (latest_run[3] if isinstance(latest_run, tuple) else latest_run.run_number)}). Please wait for it to complete or cancel it first."
+                        detail=f"Task {task_id} already has a running workflow (run #{latest_run.run_number}). Please wait for it to complete or cancel it first."
                     )
             
             # Create and submit workflow
@@ -1035,102 +1474,24 @@ async def run_task(task_id: str):
                 namespace=namespace
             )
             
-            # Get next run number
-            if has_python_code:
-                max_run = db.query(TaskRun).filter(TaskRun.task_id == task_id).order_by(TaskRun.run_number.desc()).first()
-                next_run_number = (max_run.run_number + 1) if max_run else 1
-            else:
-                result = db.execute(
-                    text("SELECT run_number FROM task_runs WHERE task_id = :task_id ORDER BY run_number DESC LIMIT 1"),
-                    {"task_id": task_id}
-                ).fetchone()
-                if result:
-                    next_run_number = (getattr(result, 'run_number', result[0]) + 1) if result else 1
-                else:
-                    next_run_number = 1
+            # Next run number follows the latest run loaded above
+            next_run_number = (latest_run.run_number + 1) if latest_run else 1
+            now = datetime.utcnow()
             
             # Create TaskRun record
-            if has_python_code:
-                task_run = TaskRun(
-                    task_id=task_id,
-                    workflow_id=workflow_id,
-                    run_number=next_run_number,
-                    phase="Pending",
-                    python_code=task.python_code,
-                    dependencies=task.dependencies,
-                    requirements_file=task.requirements_file,
-                    started_at=datetime.utcnow()
-                )
-                db.add(task_run)
-                db.commit()
-            else:
-                # Old schema: Try to add columns dynamically if they don't exist
-                try:
-                    existing_columns = [col['name'] for col in inspector.get_columns('task_runs')]
-                    
-                    if 'python_code' not in existing_columns:
-                        db.execute(text("ALTER TABLE task_runs ADD COLUMN IF NOT EXISTS python_code TEXT"))
-                        db.execute(text("ALTER TABLE task_runs ADD COLUMN IF NOT EXISTS dependencies TEXT"))
-                        db.execute(text("ALTER TABLE task_runs ADD COLUMN IF NOT EXISTS requirements_file TEXT"))
-                        db.commit()
-                        inspector = sql_inspect(engine)
-                        existing_columns = [col['name'] for col in inspector.get_columns('task_runs')]
-                    
-                    if 'python_code' in existing_columns:
-                        result = db.execute(
-                            text("""
-                                INSERT INTO task_runs (task_id, workflow_id, run_number, phase, python_code, dependencies, requirements_file, started_at, created_at)
-                                VALUES (:task_id, :workflow_id, :run_number, :phase, :python_code, :dependencies, :requirements_file, :started_at, :created_at)
-                                RETURNING id
-                            """),
-                            {
-                                "task_id": task_id,
-                                "workflow_id": workflow_id,
-                                "run_number": next_run_number,
-                                "phase": "Pending",
-                                "python_code": task.python_code,
-                                "dependencies": task.dependencies,
-                                "requirements_file": task.requirements_file,
-                                "started_at": datetime.utcnow(),
-                                "created_at": datetime.utcnow()
-                            }
-                        )
-                        db.commit()
-                    else:
-                        result = db.execute(
-                            text("""
-                                INSERT INTO task_runs (task_id, workflow_id, run_number, phase, started_at, created_at)
-                                VALUES (:task_id, :workflow_id, :run_number, :phase, :started_at, :created_at)
-                                RETURNING id
-                            """),
-                            {
-                                "task_id": task_id,
-                                "workflow_id": workflow_id,
-                                "run_number": next_run_number,
-                                "phase": "Pending",
-                                "started_at": datetime.utcnow(),
-                                "created_at": datetime.utcnow()
-                            }
-                        )
-                        db.commit()
-                except Exception as e:
-                    print(f"Warning: Could not add code columns to task_runs: {e}")
-                    result = db.execute(
-                        text("""
-                            INSERT INTO task_runs (task_id, workflow_id, run_number, phase, started_at, created_at)
-                            VALUES (:task_id, :workflow_id, :run_number, :phase, :started_at, :created_at)
-                            RETURNING id
-                        """),
-                        {
-                            "task_id": task_id,
-                            "workflow_id": workflow_id,
-                            "run_number": next_run_number,
-                            "phase": "Pending",
-                            "started_at": datetime.utcnow(),
-                            "created_at": datetime.utcnow()
-                        }
-                    )
-                    db.commit()
+            task_run = TaskRun(
+                task_id=task_id,
+                workflow_id=workflow_id,
+                run_number=next_run_number,
+                phase="Pending",
+                python_code=task.python_code,
+                dependencies=task.dependencies,
+                requirements_file=task.requirements_file,
+                started_at=now,
+                created_at=now
+            )
+            db.add(task_run)
+            db.commit()
             
             return {
                 "id": task_id,
@@ -1143,63 +1504,51 @@ async def run_task(task_id: str):
             raise
         except Exception as db_error:
             db.rollback()
-            print(f"Error saving task run to database: {db_error}")
+            logger.error("Error saving task run to database: %s", db_error)
             raise HTTPException(status_code=500, detail=f"Failed to save task run: {str(db_error)}")
-        finally:
-            db.close()
     except HTTPException:
         raise
     except Exception as e:
         # Print full error for debugging
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/v1/tasks")
-async def list_tasks():
+def list_tasks(db: Session = Depends(get_db)):
     """
     List all tasks from database with their latest run information.
     Syncs phase from Kubernetes for the latest run.
     """
     try:
-        db = next(get_db())
-        try:
-            # Get all tasks
-            tasks = db.query(Task).all()
+        # Get all tasks
+        tasks = db.query(Task).all()
+        
+        namespace = ARGO_NAMESPACE
+        api_instance = CustomObjectsApi(k8s_api_client())
+        
+        # Latest run of every task in one round trip instead of one query per task
+        latest_runs = load_latest_runs(db, [task.id for task in tasks])
+        
+        # Get latest run for each task and sync phase from Kubernetes
+        task_list = []
+        phase_changed = False
+        for task in tasks:
+            # Get latest run
+            latest_run = latest_runs.get(task.id)
             
-            namespace = os.getenv("ARGO_NAMESPACE", "argo")
-            api_instance = CustomObjectsApi()
+            # Determine phase
+            phase = "Not Started"
+            started_at = None
+            finished_at = None
             
-            # Get latest run for each task and sync phase from Kubernetes
-            task_list = []
-            for task in tasks:
-                # Get latest run
-                from sqlalchemy import inspect as sql_inspect, text
-                from app.database import engine
-                inspector = sql_inspect(engine)
-                task_runs_columns = [col['name'] for col in inspector.get_columns('task_runs')]
-                has_python_code = 'python_code' in task_runs_columns
-                
-                if has_python_code:
-                    latest_run = db.query(TaskRun).filter(
-                        TaskRun.task_id == task.id
-                    ).order_by(TaskRun.run_number.desc()).first()
-                else:
-                    result = db.execute(
-                        text("SELECT id, task_id, workflow_id, run_number, phase, started_at, finished_at, created_at FROM task_runs WHERE task_id = :task_id ORDER BY run_number DESC LIMIT 1"),
-                        {"task_id": task.id}
-                    ).fetchone()
-                    latest_run = result
-                
-                # Determine phase
-                phase = "Not Started"
-                started_at = None
-                finished_at = None
-                
-                if latest_run:
-                    # Sync phase from Kubernetes if workflow_id exists
-                    if has_python_code and latest_run.workflow_id:
+            if latest_run:
+                # Sync phase from Kubernetes if workflow_id exists
+                workflow = None
+                if latest_run.workflow_id:
+                    if workflow_informer.synced:
+                        workflow = workflow_informer.get(latest_run.workflow_id)
+                    else:
                         try:
                             workflow = api_instance.get_namespaced_custom_object(
                                 group="argoproj.io",
@@ -1208,132 +1557,106 @@ async def list_tasks():
                                 plural="workflows",
                                 name=latest_run.workflow_id
                             )
-                            status = workflow.get("status", {})
-                            phase = determine_workflow_phase(status)
-                            
-                            # Update phase in database if it changed
-                            if latest_run.phase != phase:
-                                latest_run.phase = phase
-                                db.commit()
-                            
-                            # Get timestamps from workflow
-                            if status.get("startedAt"):
-                                started_at = status["startedAt"]
-                            if status.get("finishedAt"):
-                                finished_at = status["finishedAt"]
-                        except Exception as e:
+                        except Exception:
                             # Workflow might not exist anymore, use database phase
-                            phase = latest_run.phase if has_python_code else (latest_run[4] if isinstance(latest_run, tuple) else latest_run.phase)
-                            started_at = latest_run.started_at.isoformat() if has_python_code and latest_run.started_at else (latest_run[5] if isinstance(latest_run, tuple) and len(latest_run) > 5 else None)
-                            finished_at = latest_run.finished_at.isoformat() if has_python_code and latest_run.finished_at else (latest_run[6] if isinstance(latest_run, tuple) and len(latest_run) > 6 else None)
-                    else:
-                        # Use database phase
-                        phase = latest_run.phase if has_python_code else (latest_run[4] if isinstance(latest_run, tuple) else latest_run.phase)
-                        started_at = latest_run.started_at.isoformat() if has_python_code and latest_run.started_at else (latest_run[5] if isinstance(latest_run, tuple) and len(latest_run) > 5 else None)
-                        finished_at = latest_run.finished_at.isoformat() if has_python_code and latest_run.finished_at else (latest_run[6] if isinstance(latest_run, tuple) and len(latest_run) > 6 else None)
+                            workflow = None
                 
-                task_list.append({
-                    "id": task.id,
-                    "phase": phase,
-                    "startedAt": started_at,
-                    "finishedAt": finished_at,
-                    "createdAt": task.created_at.isoformat() if task.created_at else None
-                })
+                if workflow is not None:
+                    status = workflow.get("status", {})
+                    phase = determine_workflow_phase(status)
+                    
+                    # Record phase changes; they are flushed in one commit after the loop
+                    if latest_run.phase != phase:
+                        latest_run.phase = phase
+                        phase_changed = True
+                    
+                    # Get timestamps from workflow
+                    started_at = status.get("startedAt") or None
+                    finished_at = status.get("finishedAt") or None
+                else:
+                    # Use database phase
+                    phase = latest_run.phase
+                    started_at = latest_run.started_at.isoformat() if latest_run.started_at else None
+                    finished_at = latest_run.finished_at.isoformat() if latest_run.finished_at else None
             
-            return {"tasks": task_list}
-        finally:
-            db.close()
+            task_list.append({
+                "id": task.id,
+                "phase": phase,
+                "startedAt": started_at,
+                "finishedAt": finished_at,
+                "createdAt": task.created_at.isoformat() if task.created_at else None
+            })
+        
+        if phase_changed:
+            db.commit()
+        
+        return {"tasks": task_list}
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+# One entity tag of an If-None-Match list; the W/ (weak) prefix is ignored when comparing
+ENTITY_TAG = re.compile(r'(?:W/)?("[^"]*")')
+
+def conditional_get(request: Request, response: Response, *version) -> Response | None:
+    """
+    Tag the response with an ETag built from ``version``.
+    Returns a bodiless 304 to send instead when the client already holds that version.
+    """
+    etag = '"' + hashlib.md5(repr(version).encode(), usedforsecurity=False).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, must-revalidate"}
+    if_none_match = request.headers.get("if-none-match", "").strip()
+    # Weak comparison (RFC 9110 13.1.2): proxies may weaken the tag or send several
+    if if_none_match == "*" or etag in ENTITY_TAG.findall(if_none_match):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
 @app.get("/api/v1/tasks/{task_id}")
-async def get_task(task_id: str):
+def get_task(task_id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Get a single task's details including Python code, dependencies, and run history.
     """
     try:
-        db = next(get_db())
-        task = db.query(Task).filter(Task.id == task_id).first()
+        # Check the version first so a 304 never loads the code snapshots
+        version = db.execute(TASK_VERSION, {"task_id": task_id}).all()
         
-        if not task:
-            db.close()
+        if not version:
             raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
         
-        # Check if schema supports code in runs
-        from sqlalchemy import inspect as sql_inspect
-        from app.database import engine
-        inspector = sql_inspect(engine)
-        task_runs_columns = [col['name'] for col in inspector.get_columns('task_runs')]
-        has_python_code = 'python_code' in task_runs_columns
+        # A run's code is fixed once created; only its phase and timestamps move
+        not_modified = conditional_get(request, response, version[0].updated_at,
+                                       *((row.id, row.phase, row.started_at, row.finished_at) for row in version if row.id is not None))
+        if not_modified:
+            return not_modified
         
-        # Get all runs for this task
-        if has_python_code:
-            runs = db.query(TaskRun).filter(
-                TaskRun.task_id == task_id
-            ).order_by(TaskRun.run_number.desc()).all()
-        else:
-            # Old schema: use raw SQL
-            from sqlalchemy import text
-            run_rows = db.execute(
-                text("SELECT id, task_id, workflow_id, run_number, phase, started_at, finished_at, created_at FROM task_runs WHERE task_id = :task_id ORDER BY run_number DESC"),
-                {"task_id": task_id}
-            ).fetchall()
-            runs = run_rows  # Will be list of Row objects
+        # Task and all of its runs (newest first), code snapshots included, in one query
+        task = db.query(Task).options(joinedload(Task.runs).undefer_group("code")).filter(Task.id == task_id).first()
+        
+        if not task:
+            raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+        
+        runs = task.runs
         
         run_list = []
         for run in runs:
-            if has_python_code:
-                # New schema: run is a TaskRun object
-                run_data = {
-                    "id": run.id,
-                    "runNumber": run.run_number,
-                    "workflowId": run.workflow_id,
-                    "phase": run.phase,
-                    "pythonCode": run.python_code,
-                    "dependencies": run.dependencies or "",
-                    "requirementsFile": run.requirements_file or "",
-                    "startedAt": run.started_at.isoformat() if run.started_at else "",
-                    "finishedAt": run.finished_at.isoformat() if run.finished_at else "",
-                    "createdAt": run.created_at.isoformat()
-                }
-            else:
-                # Old schema: run is a Row object
-                # NOTE: In old schema, code is NOT saved per run, so all runs show Task's code
-                # This is expected behavior until database is migrated to add python_code column to task_runs
-                # SQLAlchemy Row objects support column name access
-                run_data = {
-                    "id": getattr(run, 'id', run[0]),
-                    "runNumber": getattr(run, 'run_number', run[3] if len(run) > 3 else 0),
-                    "workflowId": getattr(run, 'workflow_id', run[2] if len(run) > 2 else ""),
-                    "phase": getattr(run, 'phase', run[4] if len(run) > 4 else "Pending"),
-                    "pythonCode": task.python_code,  # In old schema, code is only in Task, not TaskRun
-                    "dependencies": task.dependencies or "",
-                    "requirementsFile": task.requirements_file or "",
-                    "startedAt": (getattr(run, 'started_at', None) or (run[5] if len(run) > 5 else None)),
-                    "finishedAt": (getattr(run, 'finished_at', None) or (run[6] if len(run) > 6 else None)),
-                    "createdAt": (getattr(run, 'created_at', None) or (run[7] if len(run) > 7 else None))
-                }
-                # Convert datetime objects to ISO format strings
-                if run_data["startedAt"] and hasattr(run_data["startedAt"], 'isoformat'):
-                    run_data["startedAt"] = run_data["startedAt"].isoformat()
-                if run_data["finishedAt"] and hasattr(run_data["finishedAt"], 'isoformat'):
-                    run_data["finishedAt"] = run_data["finishedAt"].isoformat()
-                if run_data["createdAt"] and hasattr(run_data["createdAt"], 'isoformat'):
-                    run_data["createdAt"] = run_data["createdAt"].isoformat()
-                # Ensure empty strings if None
-                run_data["startedAt"] = run_data["startedAt"] or ""
-                run_data["finishedAt"] = run_data["finishedAt"] or ""
-                run_data["createdAt"] = run_data["createdAt"] or ""
-            run_list.append(run_data)
-        
-        db.close()
+            run_list.append({
+                "id": run.id,
+                "runNumber": run.run_number,
+                "workflowId": run.workflow_id,
+                "phase": run.phase,
+                "pythonCode": run.python_code,
+                "dependencies": run.dependencies or "",
+                "requirementsFile": run.requirements_file or "",
+                "startedAt": run.started_at.isoformat() if run.started_at else "",
+                "finishedAt": run.finished_at.isoformat() if run.finished_at else "",
+                "createdAt": run.created_at.isoformat()
+            })
         
         # Return task info with latest run's code (for backward compatibility)
         latest_run = runs[0] if runs else None
-        if latest_run and has_python_code:
-            # New schema: use latest run's code
+        if latest_run:
+            # Use latest run's code
             return {
                 "id": task.id,
                 "pythonCode": latest_run.python_code,
@@ -1344,7 +1667,7 @@ async def get_task(task_id: str):
                 "runs": run_list
             }
         else:
-            # Old schema or no runs: use task's code
+            # No runs yet: use task's code
             return {
                 "id": task.id,
                 "pythonCode": task.python_code,
@@ -1357,114 +1680,72 @@ async def get_task(task_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/v1/tasks/{task_id}/runs/{run_number}/logs")
-async def get_run_logs(task_id: str, run_number: int, db: Session = Depends(get_db)):
+def get_run_logs(task_id: str, run_number: int, request: Request, response: Response, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
     Get logs for a specific run of a task.
     """
     try:
-        # Check schema and get run appropriately
-        from sqlalchemy import inspect as sql_inspect, text
-        from app.database import engine
-        inspector = sql_inspect(engine)
-        task_runs_columns = [col['name'] for col in inspector.get_columns('task_runs')]
-        has_python_code = 'python_code' in task_runs_columns
-        
         # Get the run
-        if has_python_code:
-            run = db.query(TaskRun).filter(
-                TaskRun.task_id == task_id,
-                TaskRun.run_number == run_number
-            ).first()
-        else:
-            result = db.execute(
-                text("SELECT id, task_id, workflow_id, run_number, phase, started_at, finished_at, created_at FROM task_runs WHERE task_id = :task_id AND run_number = :run_number LIMIT 1"),
-                {"task_id": task_id, "run_number": run_number}
-            ).fetchone()
-            run = result
+        run = db.query(TaskRun).filter(
+            TaskRun.task_id == task_id,
+            TaskRun.run_number == run_number
+        ).first()
         
         if not run:
             raise HTTPException(status_code=404, detail=f"Run {run_number} not found for task {task_id}")
         
-        # Get workflow_id (handle both TaskRun objects and Row objects)
-        if has_python_code:
-            workflow_id = run.workflow_id
-        else:
-            workflow_id = getattr(run, 'workflow_id', run[2] if len(run) > 2 else None)
+        # Get workflow_id
+        workflow_id = run.workflow_id
         
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
-        custom_api = CustomObjectsApi()
+        namespace = ARGO_NAMESPACE
         
         # Get current workflow phase to ensure log phases are up-to-date
         try:
-            workflow = custom_api.get_namespaced_custom_object(
-                group="argoproj.io",
-                version="v1alpha1",
-                namespace=namespace,
-                plural="workflows",
-                name=workflow_id
-            )
+            workflow, _ = get_cached_workflow_state(workflow_id, namespace)
             status = workflow.get("status", {})
             current_workflow_phase = determine_workflow_phase(status)
             
-            # Get current phase (handle both TaskRun objects and Row objects)
-            current_phase = run.phase if has_python_code else (getattr(run, 'phase', run[4] if len(run) > 4 else "Pending"))
+            # Get current phase
+            current_phase = run.phase
             
             # Update run phase if changed
             if current_phase != current_workflow_phase:
-                if has_python_code:
-                    # New schema: update TaskRun object
-                    run.phase = current_workflow_phase
-                    if status.get("startedAt"):
-                        run.started_at = datetime.fromisoformat(status.get("startedAt").replace("Z", "+00:00"))
-                    if status.get("finishedAt"):
-                        run.finished_at = datetime.fromisoformat(status.get("finishedAt").replace("Z", "+00:00"))
-                    db.commit()
-                else:
-                    # Old schema: update using raw SQL
-                    run_id_val = getattr(run, 'id', run[0] if len(run) > 0 else None)
-                    update_params = {"run_id": run_id_val, "phase": current_workflow_phase}
-                    update_sql = "UPDATE task_runs SET phase = :phase"
-                    
-                    if status.get("startedAt"):
-                        started_str = status.get("startedAt").replace("Z", "+00:00")
-                        update_sql += ", started_at = :started_at"
-                        update_params["started_at"] = datetime.fromisoformat(started_str)
-                    if status.get("finishedAt"):
-                        finished_str = status.get("finishedAt").replace("Z", "+00:00")
-                        update_sql += ", finished_at = :finished_at"
-                        update_params["finished_at"] = datetime.fromisoformat(finished_str)
-                    
-                    update_sql += " WHERE id = :run_id"
-                    db.execute(text(update_sql), update_params)
-                    db.commit()
+                run.phase = current_workflow_phase
+                if status.get("startedAt"):
+                    run.started_at = parse_k8s_timestamp(status["startedAt"])
+                if status.get("finishedAt"):
+                    run.finished_at = parse_k8s_timestamp(status["finishedAt"])
+                db.commit()
         except Exception as e:
-            print(f"Could not fetch workflow status: {e}")
-            current_workflow_phase = run.phase if has_python_code else (getattr(run, 'phase', run[4] if len(run) > 4 else "Pending"))
+            logger.warning("Could not fetch workflow status: %s", e)
+            current_workflow_phase = run.phase
         
         # First, try to get logs from database
-        run_id_val = run.id if has_python_code else (getattr(run, 'id', run[0] if len(run) > 0 else None))
+        run_id_val = run.id
         db_logs = get_logs_from_database(run_id_val, db, task_id=task_id, workflow_id=workflow_id)
         
-        # If we have logs in database, check if phase needs updating
-        if db_logs and current_workflow_phase:
-            # Update phase if workflow has completed and log phase is stale
+        # If the workflow has completed, bring stale log phases in line with it
+        if db_logs and current_workflow_phase in TERMINAL_PHASES:
             needs_update = False
             for log_entry in db_logs:
-                if current_workflow_phase in ["Succeeded", "Failed", "Error"]:
-                    if log_entry["phase"] != current_workflow_phase:
-                        log_entry["phase"] = current_workflow_phase
-                        needs_update = True
+                if log_entry["phase"] != current_workflow_phase:
+                    log_entry["phase"] = current_workflow_phase
+                    needs_update = True
             
-            # If phase was updated, save back to database
+            # Only the phase column changed, so only that is written back
             if needs_update:
-                save_logs_to_database(run.id, db_logs, db, task_id=task_id, workflow_id=run.workflow_id)
+                background_tasks.add_task(save_log_phase_in_background, run.id, current_workflow_phase, db_logs, task_id=task_id, workflow_id=run.workflow_id)
         
         if db_logs:
+            # Entry count and size keep growing while the run is in progress, so the tag only repeats once it settles
+            not_modified = conditional_get(request, response, run.id, current_workflow_phase,
+                                           len(db_logs), sum(len(entry["logs"] or "") for entry in db_logs))
+            if not_modified:
+                return not_modified
             # Logs found in database, return them (with updated phase if needed)
             return {"logs": db_logs, "source": "database", "runId": run.id, "runNumber": run.run_number}
         
@@ -1472,53 +1753,38 @@ async def get_run_logs(task_id: str, run_number: int, db: Session = Depends(get_
         try:
             k8s_logs = fetch_logs_from_kubernetes(run.workflow_id)
             if k8s_logs:
-                # Save to database for future requests
-                save_logs_to_database(run.id, k8s_logs, db, task_id=task_id, workflow_id=run.workflow_id)
+                # Save to database for future requests, after the response has gone out
+                background_tasks.add_task(save_logs_in_background, run.id, k8s_logs, task_id=task_id, workflow_id=run.workflow_id)
                 return {"logs": k8s_logs, "source": "kubernetes", "runId": run.id, "runNumber": run.run_number}
             else:
                 return {"logs": [], "source": "kubernetes", "runId": run.id, "runNumber": run.run_number}
         except Exception as k8s_error:
             # If Kubernetes fetch fails, return empty logs
-            print(f"Could not fetch logs from Kubernetes: {k8s_error}")
+            logger.warning("Could not fetch logs from Kubernetes: %s", k8s_error)
             return {"logs": [], "source": "error", "error": str(k8s_error), "runId": run.id, "runNumber": run.run_number}
             
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/v1/tasks/{task_id}/runs/{run_number}/template")
-async def get_task_run_template(task_id: str, run_number: int, db: Session = Depends(get_db)):
+def get_task_run_template(task_id: str, run_number: int, db: Session = Depends(get_db)):
     """Get the Argo Workflow YAML template for a task run."""
     try:
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
+        namespace = ARGO_NAMESPACE
         
         # Get the task
         task = db.query(Task).filter(Task.id == task_id).first()
         if not task:
             raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
         
-        # Check schema and get run appropriately
-        from sqlalchemy import inspect as sql_inspect, text
-        from app.database import engine
-        inspector = sql_inspect(engine)
-        task_runs_columns = [col['name'] for col in inspector.get_columns('task_runs')]
-        has_python_code = 'python_code' in task_runs_columns
-        
         # Get the run
-        if has_python_code:
-            task_run = db.query(TaskRun).filter(
-                TaskRun.task_id == task_id,
-                TaskRun.run_number == run_number
-            ).first()
-        else:
-            result = db.execute(
-                text("SELECT id, task_id, workflow_id, run_number, phase, started_at, finished_at, created_at FROM task_runs WHERE task_id = :task_id AND run_number = :run_number LIMIT 1"),
-                {"task_id": task_id, "run_number": run_number}
-            ).fetchone()
-            task_run = result
+        task_run = db.query(TaskRun).filter(
+            TaskRun.task_id == task_id,
+            TaskRun.run_number == run_number
+        ).first()
         
         if not task_run:
             raise HTTPException(
@@ -1526,11 +1792,8 @@ async def get_task_run_template(task_id: str, run_number: int, db: Session = Dep
                 detail=f"Task run {run_number} not found for task {task_id}"
             )
         
-        # Get workflow_id (handle both TaskRun objects and Row objects)
-        if has_python_code:
-            workflow_id = task_run.workflow_id
-        else:
-            workflow_id = getattr(task_run, 'workflow_id', task_run[2] if len(task_run) > 2 else None)
+        # Get workflow_id
+        workflow_id = task_run.workflow_id
         
         if not workflow_id:
             raise HTTPException(
@@ -1541,7 +1804,7 @@ async def get_task_run_template(task_id: str, run_number: int, db: Session = Dep
         # Fetch workflow from Kubernetes
         try:
             from kubernetes.client import CustomObjectsApi
-            custom_api = CustomObjectsApi()
+            custom_api = CustomObjectsApi(k8s_api_client())
             
             workflow = custom_api.get_namespaced_custom_object(
                 group="argoproj.io",
@@ -1565,7 +1828,6 @@ async def get_task_run_template(task_id: str, run_number: int, db: Session = Dep
                 "yaml": yaml_str
             }
         except Exception as k8s_error:
-            import traceback
             traceback.print_exc()
             raise HTTPException(
                 status_code=500,
@@ -1574,13 +1836,12 @@ async def get_task_run_template(task_id: str, run_number: int, db: Session = Dep
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to get task run template: {str(e)}")
 
 
 @app.get("/api/v1/tasks/{task_id}/logs")
-async def get_task_logs(task_id: str, run_number: int | None = None, db: Session = Depends(get_db)):
+def get_task_logs(task_id: str, background_tasks: BackgroundTasks, run_number: int | None = None, db: Session = Depends(get_db)):
     """
     Get logs for a task. If run_number is provided, get logs for that specific run.
     Otherwise, get logs for the latest run.
@@ -1591,116 +1852,64 @@ async def get_task_logs(task_id: str, run_number: int | None = None, db: Session
         if not task:
             raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
         
-        # Check schema and get run appropriately
-        from sqlalchemy import inspect as sql_inspect, text
-        from app.database import engine
-        inspector = sql_inspect(engine)
-        task_runs_columns = [col['name'] for col in inspector.get_columns('task_runs')]
-        has_python_code = 'python_code' in task_runs_columns
-        
         # Get the run
         if run_number:
-            if has_python_code:
-                run = db.query(TaskRun).filter(
-                    TaskRun.task_id == task_id,
-                    TaskRun.run_number == run_number
-                ).first()
-            else:
-                result = db.execute(
-                    text("SELECT id, task_id, workflow_id, run_number, phase, started_at, finished_at, created_at FROM task_runs WHERE task_id = :task_id AND run_number = :run_number LIMIT 1"),
-                    {"task_id": task_id, "run_number": run_number}
-                ).fetchone()
-                run = result
+            run = db.query(TaskRun).filter(
+                TaskRun.task_id == task_id,
+                TaskRun.run_number == run_number
+            ).first()
         else:
             # Get latest run
-            if has_python_code:
-                run = db.query(TaskRun).filter(
-                    TaskRun.task_id == task_id
-                ).order_by(TaskRun.run_number.desc()).first()
-            else:
-                result = db.execute(
-                    text("SELECT id, task_id, workflow_id, run_number, phase, started_at, finished_at, created_at FROM task_runs WHERE task_id = :task_id ORDER BY run_number DESC LIMIT 1"),
-                    {"task_id": task_id}
-                ).fetchone()
-                run = result
+            run = db.query(TaskRun).filter(
+                TaskRun.task_id == task_id
+            ).order_by(TaskRun.run_number.desc()).first()
         
         if not run:
             return {"logs": [], "source": "database", "runNumber": 0}
         
-        # Get workflow_id (handle both TaskRun objects and Row objects)
-        if has_python_code:
-            workflow_id = run.workflow_id
-        else:
-            workflow_id = getattr(run, 'workflow_id', run[2] if len(run) > 2 else None)
+        # Get workflow_id
+        workflow_id = run.workflow_id
         
         # Call get_run_logs logic directly
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
-        custom_api = CustomObjectsApi()
-        
-        # Get current workflow phase
-        try:
-            workflow = custom_api.get_namespaced_custom_object(
-                group="argoproj.io",
-                version="v1alpha1",
-                namespace=namespace,
-                plural="workflows",
-                name=workflow_id
-            )
+        namespace = ARGO_NAMESPACE
+        
+        # Get current workflow phase
+        try:
+            workflow, _ = get_cached_workflow_state(workflow_id, namespace)
             status = workflow.get("status", {})
             current_workflow_phase = determine_workflow_phase(status)
             
-            # Get current phase (handle both TaskRun objects and Row objects)
-            current_phase = run.phase if has_python_code else (getattr(run, 'phase', run[4] if len(run) > 4 else "Pending"))
+            # Get current phase
+            current_phase = run.phase
             
             # Update run phase if changed
             if current_phase != current_workflow_phase:
-                if has_python_code:
-                    # New schema: update TaskRun object
-                    run.phase = current_workflow_phase
-                    if status.get("startedAt"):
-                        run.started_at = datetime.fromisoformat(status.get("startedAt").replace("Z", "+00:00"))
-                    if status.get("finishedAt"):
-                        run.finished_at = datetime.fromisoformat(status.get("finishedAt").replace("Z", "+00:00"))
-                    db.commit()
-                else:
-                    # Old schema: update using raw SQL
-                    run_id_val = getattr(run, 'id', run[0] if len(run) > 0 else None)
-                    update_params = {"run_id": run_id_val, "phase": current_workflow_phase}
-                    update_sql = "UPDATE task_runs SET phase = :phase"
-                    
-                    if status.get("startedAt"):
-                        started_str = status.get("startedAt").replace("Z", "+00:00")
-                        update_sql += ", started_at = :started_at"
-                        update_params["started_at"] = datetime.fromisoformat(started_str)
-                    if status.get("finishedAt"):
-                        finished_str = status.get("finishedAt").replace("Z", "+00:00")
-                        update_sql += ", finished_at = :finished_at"
-                        update_params["finished_at"] = datetime.fromisoformat(finished_str)
-                    
-                    update_sql += " WHERE id = :run_id"
-                    db.execute(text(update_sql), update_params)
-                    db.commit()
+                run.phase = current_workflow_phase
+                if status.get("startedAt"):
+                    run.started_at = parse_k8s_timestamp(status["startedAt"])
+                if status.get("finishedAt"):
+                    run.finished_at = parse_k8s_timestamp(status["finishedAt"])
+                db.commit()
         except Exception as e:
-            print(f"Could not fetch workflow status: {e}")
-            current_workflow_phase = run.phase if has_python_code else (getattr(run, 'phase', run[4] if len(run) > 4 else "Pending"))
+            logger.warning("Could not fetch workflow status: %s", e)
+            current_workflow_phase = run.phase
         
-        # Get run_id and run_number (handle both TaskRun objects and Row objects)
-        run_id_val = run.id if has_python_code else (getattr(run, 'id', run[0] if len(run) > 0 else None))
-        run_number_val = run.run_number if has_python_code else (getattr(run, 'run_number', run[3] if len(run) > 3 else 0))
+        # Get run_id and run_number
+        run_id_val = run.id
+        run_number_val = run.run_number
         
         # Get logs from database
         db_logs = get_logs_from_database(run_id_val, db, task_id=task_id, workflow_id=workflow_id)
         
         # Update phases if needed
-        if db_logs and current_workflow_phase:
+        if db_logs and current_workflow_phase in TERMINAL_PHASES:
             needs_update = False
             for log_entry in db_logs:
-                if current_workflow_phase in ["Succeeded", "Failed", "Error"]:
-                    if log_entry["phase"] != current_workflow_phase:
-                        log_entry["phase"] = current_workflow_phase
-                        needs_update = True
+                if log_entry["phase"] != current_workflow_phase:
+                    log_entry["phase"] = current_workflow_phase
+                    needs_update = True
             if needs_update:
-                save_logs_to_database(run_id_val, db_logs, db, task_id=task_id, workflow_id=workflow_id)
+                background_tasks.add_task(save_log_phase_in_background, run_id_val, current_workflow_phase, db_logs, task_id=task_id, workflow_id=workflow_id)
         
         if db_logs:
             return {"logs": db_logs, "source": "database", "runId": run_id_val, "runNumber": run_number_val}
@@ -1709,260 +1918,262 @@ async def get_task_logs(task_id: str, run_number: int | None = None, db: Session
         try:
             k8s_logs = fetch_logs_from_kubernetes(workflow_id)
             if k8s_logs:
-                save_logs_to_database(run_id_val, k8s_logs, db, task_id=task_id, workflow_id=workflow_id)
+                background_tasks.add_task(save_logs_in_background, run_id_val, k8s_logs, task_id=task_id, workflow_id=workflow_id)
                 return {"logs": k8s_logs, "source": "kubernetes", "runId": run_id_val, "runNumber": run_number_val}
             else:
                 return {"logs": [], "source": "kubernetes", "runId": run_id_val, "runNumber": run_number_val}
         except Exception as k8s_error:
-            print(f"Could not fetch logs from Kubernetes: {k8s_error}")
+            logger.warning("Could not fetch logs from Kubernetes: %s", k8s_error)
             return {"logs": [], "source": "error", "error": str(k8s_error), "runId": run.id, "runNumber": run.run_number}
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+class RunLogFeed:
+    """
+    Polls one task run's workflow phase and logs, and fans every update out to all
+    websockets watching that run, so concurrent viewers share one Kubernetes/database loop.
+    Workflow changes seen by the informer wake the loop at once; otherwise it refreshes
+    every WS_LOG_POLL_INTERVAL seconds to pick up new log lines.
+    Messages are put on each subscriber's queue; None marks the end of the feed.
+    """
+    
+    def __init__(self, task_id: str, run: TaskRun, db: Session, namespace: str):
+        self.task_id = task_id
+        self.run = run
+        self.run_id = run.id
+        self.workflow_id = run.workflow_id
+        self.namespace = namespace
+        self.db = db
+        self.subscribers: set[asyncio.Queue] = set()
+        # Last "logs" message, replayed to viewers that join mid-run
+        self.snapshot: dict | None = None
+        self.last_sent_logs = []
+        self.last_sent_phase = None
+        # resourceVersion -> phase of the last workflow object seen; it only changes when Argo updates the workflow
+        self.phase_by_version: dict[str, str] = {}
+        self.task: asyncio.Task | None = None
+        # Set from the informer's watch thread when the workflow changes
+        self.changed = asyncio.Event()
+        self.loop: asyncio.AbstractEventLoop | None = None
+    
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=8)
+        if self.snapshot:
+            queue.put_nowait(self.snapshot)
+        self.subscribers.add(queue)
+        return queue
+    
+    def publish(self, message: dict | None) -> None:
+        for queue in self.subscribers:
+            if queue.full():
+                # Logs messages are full snapshots, so a slow viewer only needs the newest ones
+                queue.get_nowait()
+            queue.put_nowait(message)
+    
+    def refresh(self):
+        """Blocking Kubernetes and database work for one poll; runs in a worker thread."""
+        latest_run = self.run
+        # Get workflow status using workflow_id (shared with fetch_logs_from_kubernetes below)
+        workflow, _ = get_cached_workflow_state(self.workflow_id, self.namespace)
+        
+        status = workflow.get("status", {})
+        resource_version = workflow.get("metadata", {}).get("resourceVersion")
+        phase = self.phase_by_version.get(resource_version) if resource_version else None
+        if phase is None:
+            phase = determine_workflow_phase(status)
+            self.phase_by_version.clear()
+            if resource_version:
+                self.phase_by_version[resource_version] = phase
+        
+        # Get current phase
+        current_phase = latest_run.phase
+        
+        # Update run phase if changed
+        phase_updated = current_phase != phase
+        if phase_updated:
+            latest_run.phase = phase
+            try:
+                if status.get("startedAt"):
+                    latest_run.started_at = parse_k8s_timestamp(status["startedAt"])
+                if status.get("finishedAt"):
+                    latest_run.finished_at = parse_k8s_timestamp(status["finishedAt"])
+            except Exception as dt_error:
+                logger.warning("Error parsing datetime: %s", dt_error)
+        
+        # Try to get logs from database first (using run_id)
+        db_logs = get_logs_from_database(self.run_id, self.db, task_id=self.task_id, workflow_id=self.workflow_id)
+        
+        # Also fetch latest from Kubernetes to get any new logs
+        try:
+            k8s_logs = fetch_logs_from_kubernetes(self.workflow_id, self.namespace)
+            
+            # Save/update logs in database (using run_id), unless unchanged since the last send
+            if k8s_logs:
+                if k8s_logs != self.last_sent_logs:
+                    save_logs_to_database(self.run_id, k8s_logs, self.db, task_id=self.task_id, workflow_id=self.workflow_id)
+                # Use Kubernetes logs (they're more up-to-date)
+                all_logs = k8s_logs
+            elif db_logs:
+                # Use database logs if Kubernetes fetch failed
+                all_logs = db_logs
+            else:
+                all_logs = []
+        except Exception as k8s_error:
+            # If Kubernetes fetch fails, use database logs
+            if db_logs:
+                all_logs = db_logs
+            else:
+                all_logs = []
+        
+        # One commit per poll for the phase sync (an inline log save above may already have committed it)
+        if phase_updated:
+            self.db.commit()
+        return phase, all_logs
+    
+    def wake(self) -> None:
+        """Informer listener; called on the watch thread."""
+        self.loop.call_soon_threadsafe(self.changed.set)
+    
+    async def poll(self):
+        """Poll until the workflow finishes or the last viewer leaves."""
+        self.loop = asyncio.get_running_loop()
+        watched = self.namespace == workflow_informer.namespace
+        if watched:
+            workflow_informer.add_listener(self.workflow_id, self.wake)
+        try:
+            while self.subscribers:
+                # Cleared before the refresh so a change that lands during it triggers the next one
+                self.changed.clear()
+                try:
+                    # Keep the event loop free for other connections while Argo and Postgres respond
+                    phase, all_logs = await asyncio.to_thread(self.refresh)
+                except Exception as e:
+                    logger.error("Error polling logs for %s: %s", self.workflow_id, e)
+                    traceback.print_exc()
+                    self.publish({"type": "error", "message": str(e)})
+                    await asyncio.sleep(1)
+                    continue
+                
+                # Send updates if logs changed OR phase changed (for immediate phase updates).
+                # Comparing with the last sent entries directly avoids serializing every log body.
+                if all_logs != self.last_sent_logs or phase != self.last_sent_phase:
+                    self.last_sent_logs = all_logs
+                    self.last_sent_phase = phase
+                    self.snapshot = {"type": "logs", "data": all_logs, "workflow_phase": phase}
+                    self.publish(self.snapshot)
+                
+                # Check if workflow is finished
+                if phase in TERMINAL_PHASES:
+                    # The poll above read the logs after the workflow finished (and saved them);
+                    # fetch again only if it came back empty
+                    try:
+                        final_logs = [] if all_logs else await asyncio.to_thread(fetch_logs_from_kubernetes, self.workflow_id, self.namespace)
+                        if final_logs:
+                            await asyncio.to_thread(save_logs_to_database, self.run_id, final_logs, self.db, task_id=self.task_id, workflow_id=self.workflow_id)
+                            self.publish({"type": "logs", "data": final_logs, "workflow_phase": phase})
+                    except Exception as e:
+                        logger.warning("Could not fetch final logs for %s: %s", self.workflow_id, e)
+                    
+                    self.publish({"type": "complete", "workflow_phase": phase})
+                    break
+                
+                # Phase changes arrive as informer events; the timeout is only for new log lines
+                try:
+                    await asyncio.wait_for(self.changed.wait(), WS_LOG_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if watched:
+                workflow_informer.remove_listener(self.workflow_id, self.wake)
+            # Nothing awaits between the loop exiting and this, so no viewer can join a finished feed
+            if _run_log_feeds.get(self.run_id) is self:
+                del _run_log_feeds[self.run_id]
+            self.db.close()
+            self.publish(None)
+
+
+# Seconds between log refreshes of a running workflow when the informer reports no change
+WS_LOG_POLL_INTERVAL = float(os.getenv("WS_LOG_POLL_INTERVAL", "2"))
+
+
+# Run id -> feed currently polling that run
+_run_log_feeds: dict[int, RunLogFeed] = {}
+
+
+def join_run_log_feed(task_id: str, run: TaskRun, db: Session, namespace: str) -> tuple[RunLogFeed, asyncio.Queue]:
+    """
+    Subscribe to the feed for ``run``. A new feed takes over ``db`` and closes it when it
+    stops; if the run is already being polled, ``db`` is closed here.
+    """
+    feed = _run_log_feeds.get(run.id)
+    if feed is None:
+        feed = _run_log_feeds[run.id] = RunLogFeed(task_id, run, db, namespace)
+        queue = feed.subscribe()
+        feed.task = asyncio.create_task(feed.poll())
+    else:
+        db.close()
+        queue = feed.subscribe()
+    return feed, queue
+
+
 @app.websocket("/ws/tasks/{task_id}/logs")
 async def websocket_logs(websocket: WebSocket, task_id: str):
     """
     WebSocket endpoint for streaming logs. Fetches from database first,
     then from Kubernetes, and saves new logs to database.
-    Uses the latest run's workflow_id to fetch logs.
+    Uses the latest run's workflow_id to fetch logs; connections watching
+    the same run share one RunLogFeed.
     """
     await websocket.accept()
-    namespace = os.getenv("ARGO_NAMESPACE", "argo")
-    core_api = CoreV1Api()
-    custom_api = CustomObjectsApi()
     
     # Get database session
     db = SessionLocal()
     
-    # Get the latest run for this task (handle schema migration)
-    from sqlalchemy import inspect as sql_inspect, text
-    from app.database import engine
-    inspector = sql_inspect(engine)
-    task_runs_columns = [col['name'] for col in inspector.get_columns('task_runs')]
-    has_python_code = 'python_code' in task_runs_columns
-    
-    if has_python_code:
-        # New schema: use ORM
-        latest_run = db.query(TaskRun).filter(
-            TaskRun.task_id == task_id
-        ).order_by(TaskRun.run_number.desc()).first()
-    else:
-        # Old schema: use raw SQL
-        result = db.execute(
-            text("SELECT id, task_id, workflow_id, run_number, phase, started_at, finished_at, created_at FROM task_runs WHERE task_id = :task_id ORDER BY run_number DESC LIMIT 1"),
-            {"task_id": task_id}
-        ).fetchone()
-        latest_run = result  # Will be a Row object
+    # Get the latest run for this task
+    latest_run = db.scalars(LATEST_TASK_RUN, {"task_id": task_id}).first()
     
     if not latest_run:
-        await websocket.send_json({
+        await send_ws_json(websocket, {
             "type": "error",
             "message": f"No runs found for task {task_id}"
         })
         db.close()
         return
     
-    # Handle both TaskRun objects and Row objects
-    if has_python_code:
-        workflow_id = latest_run.workflow_id
-        run_id = latest_run.id
-    else:
-        run_id = getattr(latest_run, 'id', latest_run[0] if len(latest_run) > 0 else None)
-        workflow_id = getattr(latest_run, 'workflow_id', latest_run[2] if len(latest_run) > 2 else None)
-    
-    last_logs_hash = ""
-    last_sent_logs = []
-    last_sent_phase = None
-    
-    # Helper function to fetch and send logs
-    async def fetch_and_send_logs():
-        nonlocal last_logs_hash, last_sent_logs, last_sent_phase, latest_run
-        try:
-            # Get workflow status using workflow_id
-            workflow = custom_api.get_namespaced_custom_object(
-                group="argoproj.io",
-                version="v1alpha1",
-                namespace=namespace,
-                plural="workflows",
-                name=workflow_id
-            )
-            
-            status = workflow.get("status", {})
-            phase = determine_workflow_phase(status)
-            
-            # Get current phase (handle both TaskRun objects and Row objects)
-            current_phase = latest_run.phase if has_python_code else (getattr(latest_run, 'phase', latest_run[4] if len(latest_run) > 4 else "Pending"))
-            
-            # Update run phase if changed
-            if current_phase != phase:
-                if has_python_code:
-                    # New schema: update TaskRun object
-                    latest_run.phase = phase
-                    try:
-                        if status.get("startedAt"):
-                            started_str = status.get("startedAt")
-                            if started_str.endswith("Z"):
-                                started_str = started_str.replace("Z", "+00:00")
-                            latest_run.started_at = datetime.fromisoformat(started_str)
-                        if status.get("finishedAt"):
-                            finished_str = status.get("finishedAt")
-                            if finished_str.endswith("Z"):
-                                finished_str = finished_str.replace("Z", "+00:00")
-                            latest_run.finished_at = datetime.fromisoformat(finished_str)
-                    except Exception as dt_error:
-                        print(f"Error parsing datetime: {dt_error}")
-                    db.commit()
-                else:
-                    # Old schema: update using raw SQL
-                    update_params = {"run_id": run_id, "phase": phase}
-                    update_sql = "UPDATE task_runs SET phase = :phase"
-                    
-                    try:
-                        if status.get("startedAt"):
-                            started_str = status.get("startedAt")
-                            if started_str.endswith("Z"):
-                                started_str = started_str.replace("Z", "+00:00")
-                            update_sql += ", started_at = :started_at"
-                            update_params["started_at"] = datetime.fromisoformat(started_str)
-                        if status.get("finishedAt"):
-                            finished_str = status.get("finishedAt")
-                            if finished_str.endswith("Z"):
-                                finished_str = finished_str.replace("Z", "+00:00")
-                            update_sql += ", finished_at = :finished_at"
-                            update_params["finished_at"] = datetime.fromisoformat(finished_str)
-                    except Exception as dt_error:
-                        print(f"Error parsing datetime: {dt_error}")
-                    
-                    update_sql += " WHERE id = :run_id"
-                    db.execute(text(update_sql), update_params)
-                    db.commit()
-                    
-                    # Refresh latest_run by re-querying
-                    latest_run = db.execute(
-                        text("SELECT id, task_id, workflow_id, run_number, phase, started_at, finished_at, created_at FROM task_runs WHERE id = :run_id"),
-                        {"run_id": run_id}
-                    ).fetchone()
-            
-            # Try to get logs from database first (using run_id)
-            db_logs = get_logs_from_database(run_id, db, task_id=task_id, workflow_id=workflow_id)
-            
-            # Also fetch latest from Kubernetes to get any new logs
-            try:
-                k8s_logs = fetch_logs_from_kubernetes(workflow_id, namespace)
-                
-                # Save/update logs in database (using run_id)
-                if k8s_logs:
-                    save_logs_to_database(run_id, k8s_logs, db, task_id=task_id, workflow_id=workflow_id)
-                    # Use Kubernetes logs (they're more up-to-date)
-                    all_logs = k8s_logs
-                elif db_logs:
-                    # Use database logs if Kubernetes fetch failed
-                    all_logs = db_logs
-                else:
-                    all_logs = []
-            except Exception as k8s_error:
-                # If Kubernetes fetch fails, use database logs
-                if db_logs:
-                    all_logs = db_logs
-                else:
-                    all_logs = []
-            
-            # Create hash to check if logs changed
-            logs_hash = json.dumps(all_logs, sort_keys=True)
-            
-            # Send updates if logs changed OR phase changed (for immediate phase updates)
-            logs_changed = logs_hash != last_logs_hash
-            phase_changed = phase != last_sent_phase
-            
-            if logs_changed or phase_changed:
-                if logs_changed:
-                    last_logs_hash = logs_hash
-                    last_sent_logs = all_logs
-                
-                if phase_changed:
-                    last_sent_phase = phase
-                
-                try:
-                    await websocket.send_json({
-                        "type": "logs",
-                        "data": all_logs,
-                        "workflow_phase": phase
-                    })
-                except (WebSocketDisconnect, RuntimeError) as ws_error:
-                    # Connection closed, stop trying to send
-                    raise ws_error
-            
-            return phase, all_logs
-        except (WebSocketDisconnect, RuntimeError) as ws_error:
-            # Connection closed, re-raise to break the loop
-            raise ws_error
-        except Exception as e:
-            print(f"Error in fetch_and_send_logs: {e}")
-            import traceback
-            traceback.print_exc()
-            try:
-                await websocket.send_json({
-                    "type": "error",
-                    "message": str(e)
-                })
-            except (WebSocketDisconnect, RuntimeError):
-                # Connection closed, can't send error message
-                raise
-            return "Unknown", []
-    
+    feed, queue = join_run_log_feed(task_id, latest_run, db, ARGO_NAMESPACE)
     try:
-        # Send initial logs immediately upon connection
-        phase, _ = await fetch_and_send_logs()
-        
-        # Then continue polling
-        while True:
-            phase, all_logs = await fetch_and_send_logs()
-            
-            # Check if workflow is finished
-            if phase in ["Succeeded", "Failed", "Error"]:
-                # Final save to ensure all logs are persisted
-                try:
-                    final_logs = fetch_logs_from_kubernetes(workflow_id, namespace)
-                    if final_logs:
-                        save_logs_to_database(run_id, final_logs, db, task_id=task_id, workflow_id=workflow_id)
-                        # Send final logs update
-                        try:
-                            await websocket.send_json({
-                                "type": "logs",
-                                "data": final_logs,
-                                "workflow_phase": phase
-                            })
-                        except (WebSocketDisconnect, RuntimeError):
-                            # Connection closed, break out
-                            break
-                except:
-                    pass
+        finished = False
+        while not finished:
+            batch = [await queue.get()]
+            # Handle everything already queued in this wakeup. A logs message is a full
+            # snapshot, so only the newest one in the batch needs to go out.
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            newest_logs = max((i for i, message in enumerate(batch) if message and message["type"] == "logs"), default=-1)
+            for i, message in enumerate(batch):
+                if message is None:
+                    # Feed stopped without completing
+                    finished = True
+                    break
+                if message["type"] == "logs" and i != newest_logs:
+                    continue
+                await send_ws_json(websocket, message)
                 
-                try:
-                    await websocket.send_json({
-                        "type": "complete",
-                        "workflow_phase": phase
-                    })
+                if message["type"] == "complete":
                     # Keep connection open for a bit, then close
                     await asyncio.sleep(2)
-                except (WebSocketDisconnect, RuntimeError):
-                    # Connection already closed
-                    pass
-                break
-            
-            # Wait before next check - reduced to 1 second for faster phase detection
-            await asyncio.sleep(1)
+                    finished = True
+                    break
                 
     except (WebSocketDisconnect, RuntimeError):
         # Connection closed by client, this is normal
         pass
     except Exception as e:
         try:
-            await websocket.send_json({
+            await send_ws_json(websocket, {
                 "type": "error",
                 "message": f"Connection error: {str(e)}"
             })
@@ -1972,17 +2183,17 @@ async def websocket_logs(websocket: WebSocket, task_id: str):
         except:
             pass
     finally:
-        db.close()
+        feed.subscribers.discard(queue)
 
 @app.delete("/api/v1/tasks/{task_id}")
-async def cancel_task(task_id: str):
+def cancel_task(task_id: str):
     """
     Cancel a running or pending task by deleting the workflow from Kubernetes.
     Does not delete logs from database.
     """
     try:
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
-        api_instance = CustomObjectsApi()
+        namespace = ARGO_NAMESPACE
+        api_instance = CustomObjectsApi(k8s_api_client())
         
         # Delete the workflow
         api_instance.delete_namespaced_custom_object(
@@ -1995,7 +2206,6 @@ async def cancel_task(task_id: str):
         
         return {"status": "cancelled", "id": task_id}
     except Exception as e:
-        import traceback
         traceback.print_exc()
         # Check if it's a 404 (workflow not found)
         if "404" in str(e) or "Not Found" in str(e):
@@ -2003,123 +2213,78 @@ async def cancel_task(task_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Workflow deletions a single delete_task request keeps in flight
+K8S_DELETE_WORKERS = 10
+
+
 @app.delete("/api/v1/tasks/{task_id}/delete")
-async def delete_task(task_id: str, db: Session = Depends(get_db)):
+def delete_task(task_id: str, db: Session = Depends(get_db)):
     """
     Permanently delete a task: removes all workflows from Kubernetes AND all runs/logs from database.
     Works for any task regardless of status.
     """
     try:
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
-        api_instance = CustomObjectsApi()
+        namespace = ARGO_NAMESPACE
+        api_instance = CustomObjectsApi(k8s_api_client())
         
-        # Initialize counters
-        deleted_logs = 0
-        deleted_runs = 0
         deleted_workflows = 0
         
-        # Get the task and all its runs
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
+        if db.scalar(select(Task.id).where(Task.id == task_id)) is None:
             raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
         
-        # Check schema and get runs appropriately
-        from sqlalchemy import text, inspect
-        from app.database import engine
-        inspector = inspect(engine)
-        task_runs_columns = [col['name'] for col in inspector.get_columns('task_runs')]
-        has_python_code = 'python_code' in task_runs_columns
-        
-        # Get all runs for this task to delete workflows
-        if has_python_code:
-            # New schema: use ORM
-            runs = db.query(TaskRun).filter(TaskRun.task_id == task_id).all()
-        else:
-            # Old schema: use raw SQL
-            run_rows = db.execute(
-                text("SELECT id, workflow_id FROM task_runs WHERE task_id = :task_id"),
-                {"task_id": task_id}
-            ).fetchall()
-            runs = run_rows
+        # Only the runs' workflow names are needed, to delete the workflows
+        run_workflow_ids = db.scalars(select(TaskRun.workflow_id).where(TaskRun.task_id == task_id)).all()
+        deleted_runs = len(run_workflow_ids)
         
         # Delete workflows from Kubernetes
-        for run in runs:
-            # Handle both TaskRun objects and Row objects
-            if has_python_code:
-                workflow_id = run.workflow_id
-            else:
-                workflow_id = getattr(run, 'workflow_id', run[1] if len(run) > 1 else None)
-            
-            if workflow_id:
-                try:
-                    api_instance.delete_namespaced_custom_object(
-                        group="argoproj.io",
-                        version="v1alpha1",
-                        namespace=namespace,
-                        plural="workflows",
-                        name=workflow_id
-                    )
-                    deleted_workflows += 1
-                except Exception as k8s_error:
-                    # If workflow doesn't exist in Kubernetes, that's okay
-                    if "404" not in str(k8s_error) and "Not Found" not in str(k8s_error):
-                        print(f"Warning: Could not delete workflow {workflow_id}: {k8s_error}")
+        def delete_workflow(workflow_id: str) -> bool:
+            try:
+                api_instance.delete_namespaced_custom_object(
+                    group="argoproj.io",
+                    version="v1alpha1",
+                    namespace=namespace,
+                    plural="workflows",
+                    name=workflow_id
+                )
+                return True
+            except Exception as k8s_error:
+                # If workflow doesn't exist in Kubernetes, that's okay
+                if "404" not in str(k8s_error) and "Not Found" not in str(k8s_error):
+                    logger.warning("Could not delete workflow %s: %s", workflow_id, k8s_error)
+                return False
+        
+        # Independent API calls: issue up to K8S_DELETE_WORKERS at once instead of one after another
+        workflow_ids = [workflow_id for workflow_id in run_workflow_ids if workflow_id]
+        if workflow_ids:
+            with ThreadPoolExecutor(max_workers=min(K8S_DELETE_WORKERS, len(workflow_ids))) as pool:
+                deleted_workflows = sum(pool.map(delete_workflow, workflow_ids))
         
         # Delete task from database
-        # Manually delete runs first to avoid ORM relationship loading issues with unmigrated schema
         try:
-            deleted_runs = len(runs)
-            deleted_logs = 0
-            
-            # Check which schema we're using
-            from sqlalchemy import text, inspect
-            from app.database import engine
-            inspector = inspect(engine)
-            task_logs_columns = [col['name'] for col in inspector.get_columns('task_logs')]
-            has_run_id = 'run_id' in task_logs_columns
-            has_task_id = 'task_id' in task_logs_columns
-            
-            # Delete logs first (manually to avoid ORM relationship issues)
-            if has_run_id:
-                # New schema: delete logs via run_id
-                for run in runs:
-                    run_id = run.id if has_python_code else (getattr(run, 'id', run[0]) if len(run) > 0 else None)
-                    if run_id:
-                        log_count = db.execute(text("DELETE FROM task_logs WHERE run_id = :run_id"), {"run_id": run_id}).rowcount  # type: ignore
-                        deleted_logs += log_count
-            elif has_task_id:
-                # Old schema: delete logs via task_id
-                deleted_logs = db.execute(text("DELETE FROM task_logs WHERE task_id = :task_id"), {"task_id": task_id}).rowcount  # type: ignore
-            # If neither exists, logs table might be empty or in unexpected state
+            # Legacy task_logs rows are keyed by task_id, with no foreign key to cascade from
+            task_logs_columns = table_columns('task_logs')
+            if 'run_id' not in task_logs_columns and 'task_id' in task_logs_columns:
+                db.execute(text("DELETE FROM task_logs WHERE task_id = :task_id"), {"task_id": task_id})
             
-            # Delete runs manually (to avoid ORM cascade loading relationships)
-            for run in runs:
-                run_id = run.id if has_python_code else (getattr(run, 'id', run[0]) if len(run) > 0 else None)
-                if run_id:
-                    db.execute(text("DELETE FROM task_runs WHERE id = :run_id"), {"run_id": run_id})
-            
-            # Finally delete the task using raw SQL to avoid ORM cascade issues
-            # Using raw SQL prevents SQLAlchemy from trying to load relationships with non-existent columns
+            # ON DELETE CASCADE on task_runs.task_id and task_logs.run_id removes the runs and their logs
             db.execute(text("DELETE FROM tasks WHERE id = :task_id"), {"task_id": task_id})
             db.commit()
             
-            print(f"Deleted task {task_id}: {deleted_runs} runs, {deleted_logs} log entries, {deleted_workflows} workflows")
+            logger.info("Deleted task %s: %s runs, %s workflows", task_id, deleted_runs, deleted_workflows)
         except Exception as db_error:
             db.rollback()
-            print(f"Error deleting task from database: {db_error}")
+            logger.error("Error deleting task from database: %s", db_error)
             raise
         
         return {
             "status": "deleted", 
             "id": task_id,
             "runs_deleted": deleted_runs,
-            "logs_deleted": deleted_logs,
             "workflows_deleted": deleted_workflows
         }
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         # Check if it's a 404 (task not found)
         if "404" in str(e) or "Not Found" in str(e):
@@ -2128,11 +2293,117 @@ async def delete_task(task_id: str, db: Session = Depends(get_db)):
 
 @app.post("/api/v1/tasks/callback")
 async def handle_callback(data: dict):
-    print(f"Callback: {data}")
+    logger.debug("Callback: %s", data)
     return {"status": "ok"}
 
 
 # PV File Manager APIs
+# Long-running helper inside the PV pod (see PersistentPVPod.call): one JSON request per stdin line,
+# one JSON reply per stdout line. Missing paths are reported as {"error": ...}; anything unexpected
+# as {"failure": ...}.
+PV_WORKER_SCRIPT = """
+import base64, json, os, shutil, sys
+from datetime import datetime
+
+
+def list_dir(path):
+    if not os.path.exists(path):
+        return {"error": f"Path does not exist: {path}"}
+    if not os.path.isdir(path):
+        return {"error": f"Path is not a directory: {path}"}
+    items = []
+    # scandir hands back the entry type with the listing, so each item needs at most one stat call
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+                stat_info = entry.stat()
+            except OSError:
+                # Skip items we can't access
+                continue
+            items.append({
+                "id": entry.path,
+                "name": entry.name,
+                "type": "folder" if is_dir else "file",
+                "size": 0 if is_dir else stat_info.st_size,
+                "date": datetime.fromtimestamp(stat_info.st_mtime).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            })
+    items.sort(key=lambda item: item["name"])
+    return {"items": items}
+
+
+def read_file(path):
+    if not os.path.exists(path):
+        return {"error": f"File does not exist: {path}"}
+    if os.path.isdir(path):
+        return {"error": f"Path is a directory: {path}"}
+    with open(path, "rb") as f:
+        content_bytes = f.read()
+    try:
+        return {"content": content_bytes.decode("utf-8"), "encoding": "text"}
+    except UnicodeDecodeError:
+        # Not text: send it base64 encoded
+        return {"content": base64.b64encode(content_bytes).decode("ascii"), "encoding": "base64"}
+
+
+def copy_file(source, destination):
+    shutil.copyfile(source, destination)
+    # Readable by all (644 = rw-r--r--)
+    os.chmod(destination, 0o644)
+    return {}
+
+
+def reserve_file(directory, name):
+    # Claim the first free name among name, base_1.ext, base_2.ext, ... with O_EXCL,
+    # so two uploads of the same name never pick the same path
+    os.makedirs(directory, exist_ok=True)
+    base, dot, extension = name.rpartition(".")
+    if dot:
+        extension = "." + extension
+    else:
+        base, extension = name, ""
+    candidate, counter = name, 0
+    while True:
+        path = os.path.join(directory, candidate)
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+            return {"path": path}
+        except FileExistsError:
+            counter += 1
+            candidate = f"{base}_{counter}{extension}"
+
+
+def remove_file(path):
+    os.remove(path)
+    return {}
+
+
+OPS = {"ls": list_dir, "read": read_file, "copy": copy_file, "reserve": reserve_file, "rm": remove_file}
+
+for line in sys.stdin:
+    request = json.loads(line)
+    try:
+        reply = OPS[request["op"]](**request["args"])
+    except Exception as e:
+        reply = {"failure": f"{type(e).__name__}: {e}"}
+    # ASCII-only JSON on one line: safe to split into websocket frames anywhere
+    sys.stdout.write(json.dumps(reply) + "\\n")
+    sys.stdout.flush()
+"""
+
+# Preview content types by file extension; these are streamed as raw bytes
+PV_IMAGE_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".svg": "image/svg+xml",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+    ".ico": "image/x-icon",
+}
+
+
 @app.get("/api/v1/pv/files")
 async def list_pv_files(path: str = "/mnt/results"):
     """
@@ -2148,109 +2419,17 @@ async def list_pv_files(path: str = "/mnt/results"):
     try:
         # Use persistent pod for fast execution
         pod = get_persistent_pv_pod()
+        result = await pod.call_async("ls", path=path)
         
-        # Escape path for shell command
-        escaped_path = path.replace("'", "'\"'\"'")
-        
-        # Execute Python script in persistent pod
-        python_script = f"""
-import os
-import json
-import stat
-from datetime import datetime
-
-path = '{escaped_path}'
-
-if not os.path.exists(path):
-    print(json.dumps({{"error": f"Path does not exist: {{path}}"}}))
-    exit(1)
-
-if not os.path.isdir(path):
-    print(json.dumps({{"error": f"Path is not a directory: {{path}}"}}))
-    exit(1)
-
-items = []
-for item in sorted(os.listdir(path)):
-    item_path = os.path.join(path, item)
-    try:
-        stat_info = os.stat(item_path)
-        is_dir = os.path.isdir(item_path)
-        
-        # Format date
-        mtime = datetime.fromtimestamp(stat_info.st_mtime)
-        date_str = mtime.strftime("%Y-%m-%dT%H:%M:%SZ")
-        
-        items.append({{
-            "id": item_path,
-            "name": item,
-            "type": "folder" if is_dir else "file",
-            "size": stat_info.st_size if not is_dir else 0,
-            "date": date_str
-        }})
-    except Exception as e:
-        # Skip items we can't access
-        continue
-
-print(json.dumps({{"items": items}}))
-"""
-        
-        # Execute command - write script to temp file to avoid shell escaping issues
-        import base64
-        script_b64 = base64.b64encode(python_script.encode('utf-8')).decode('utf-8')
-        command = f"echo {script_b64} | base64 -d > /tmp/script.py && python3 /tmp/script.py"
-        output = pod.exec_command(command)
+        if "error" in result:
+            raise HTTPException(status_code=404, detail=result["error"])
         
-        # Parse JSON from output
-        try:
-            # Clean up the output - remove any leading/trailing whitespace
-            output_lines = output.strip().split('\n')
-            # Find the JSON line (should be the last line or the one with {})
-            json_str = None
-            for line in reversed(output_lines):
-                line = line.strip()
-                if line.startswith('{') and line.endswith('}'):
-                    json_str = line
-                    break
-            
-            if not json_str:
-                # Try to extract JSON from the entire output
-                import re
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', output, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0)
-            
-            if not json_str:
-                raise HTTPException(status_code=500, detail=f"No JSON found in output: {output[:200]}")
-            
-            # Try to parse as JSON first
-            try:
-                result = json.loads(json_str)
-            except json.JSONDecodeError:
-                # If JSON parsing fails, try to parse as Python dict (handle single quotes)
-                import ast
-                try:
-                    # Use ast.literal_eval to safely parse Python dict syntax
-                    result = ast.literal_eval(json_str)
-                except (ValueError, SyntaxError):
-                    # Last resort: try to fix common issues
-                    # Replace single quotes with double quotes (simple approach)
-                    fixed_json = json_str.replace("'", '"')
-                    result = json.loads(fixed_json)
-            
-            if "error" in result:
-                raise HTTPException(status_code=404, detail=result["error"])
-            
-            # Return in SVAR File Manager format
-            return {"data": result.get("items", [])}
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to parse output: {str(e)}. Output: {output[:500]}")
+        # Return in SVAR File Manager format
+        return {"data": result["items"]}
     
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error accessing PV: {str(e)}")
 
@@ -2269,89 +2448,16 @@ async def read_pv_file(path: str):
     try:
         # Use persistent pod for fast execution
         pod = get_persistent_pv_pod()
+        result = await pod.call_async("read", path=path)
         
-        # Escape path for shell command
-        escaped_path = path.replace("'", "'\"'\"'")
-        
-        # Execute Python script in persistent pod
-        python_script = f"""
-import os
-import json
-import base64
-
-path = '{escaped_path}'
-
-if not os.path.exists(path):
-    print(json.dumps({{"error": f"File does not exist: {{path}}"}}))
-    exit(1)
-
-if os.path.isdir(path):
-    print(json.dumps({{"error": f"Path is a directory: {{path}}"}}))
-    exit(1)
-
-# Try to read as text first
-try:
-    with open(path, "r", encoding="utf-8") as f:
-        content = f.read()
-    print(json.dumps({{"content": content, "encoding": "text"}}))
-except (UnicodeDecodeError, UnicodeError):
-    # If text decoding fails, read as binary and encode as base64
-    with open(path, "rb") as f:
-        content_bytes = f.read()
-        content_base64 = base64.b64encode(content_bytes).decode("utf-8")
-    print(json.dumps({{"content": content_base64, "encoding": "base64"}}))
-"""
-        
-        # Execute command - write script to temp file to avoid shell escaping issues
-        import base64
-        script_b64 = base64.b64encode(python_script.encode('utf-8')).decode('utf-8')
-        command = f"echo {script_b64} | base64 -d > /tmp/script.py && python3 /tmp/script.py"
-        output = pod.exec_command(command)
+        if "error" in result:
+            raise HTTPException(status_code=404, detail=result["error"])
         
-        # Parse JSON from output
-        try:
-            # Clean up the output
-            output_lines = output.strip().split('\n')
-            json_str = None
-            for line in reversed(output_lines):
-                line = line.strip()
-                if line.startswith('{') and line.endswith('}'):
-                    json_str = line
-                    break
-            
-            if not json_str:
-                import re
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', output, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0)
-            
-            if not json_str:
-                raise HTTPException(status_code=500, detail=f"No JSON found in output: {output[:200]}")
-            
-            # Try to parse as JSON first
-            try:
-                result = json.loads(json_str)
-            except json.JSONDecodeError:
-                import ast
-                try:
-                    result = ast.literal_eval(json_str)
-                except (ValueError, SyntaxError):
-                    fixed_json = json_str.replace("'", '"')
-                    result = json.loads(fixed_json)
-            
-            if "error" in result:
-                raise HTTPException(status_code=404, detail=result["error"])
-            
-            return result
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to parse output: {str(e)}. Output: {output[:500]}")
+        return result
     
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
 
@@ -2367,144 +2473,32 @@ async def preview_pv_file(path: str, width: int | None = None, height: int | Non
     if not (path == "/mnt" or path.startswith("/mnt/results")):
         raise HTTPException(status_code=400, detail="Path must be /mnt or within /mnt/results")
     
-    # Check if file is an image
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.bmp', '.ico'}
-    is_image = any(path.lower().endswith(ext) for ext in image_extensions)
+    # Images are sent as raw bytes with their content type
+    content_type = PV_IMAGE_TYPES.get(os.path.splitext(path.lower())[1])
     
     try:
         # Use persistent pod for fast execution
         pod = get_persistent_pv_pod()
         
-        # Escape path for shell command
-        escaped_path = path.replace("'", "'\"'\"'")
+        if content_type:
+            # Piped straight from `cat` in the pod to the client: no base64, no JSON, no full copy in memory
+            try:
+                chunks = await asyncio.to_thread(pod.read_file, path)
+            except (FileNotFoundError, IsADirectoryError) as e:
+                raise HTTPException(status_code=404, detail=str(e))
+            return StreamingResponse(chunks, media_type=content_type)
         
-        if is_image:
-            # For images, return binary content directly
-            python_script = f"""
-import os
-import json
-import base64
-
-path = '{escaped_path}'
-
-if not os.path.exists(path):
-    print(json.dumps({{"error": f"File does not exist: {{path}}"}}))
-    exit(1)
-
-if os.path.isdir(path):
-    print(json.dumps({{"error": f"Path is a directory: {{path}}"}}))
-    exit(1)
-
-# Read as binary and encode as base64
-with open(path, "rb") as f:
-    content_bytes = f.read()
-    content_base64 = base64.b64encode(content_bytes).decode("utf-8")
-print(json.dumps({{"content": content_base64, "encoding": "base64", "mime_type": "image"}}))
-"""
-        else:
-            # For non-images, return text or base64
-            python_script = f"""
-import os
-import json
-import base64
-
-path = '{escaped_path}'
-
-if not os.path.exists(path):
-    print(json.dumps({{"error": f"File does not exist: {{path}}"}}))
-    exit(1)
-
-if os.path.isdir(path):
-    print(json.dumps({{"error": f"Path is a directory: {{path}}"}}))
-    exit(1)
-
-# Try to read as text first
-try:
-    with open(path, "r", encoding="utf-8") as f:
-        content = f.read()
-    print(json.dumps({{"content": content, "encoding": "text"}}))
-except (UnicodeDecodeError, UnicodeError):
-    # If text decoding fails, read as binary and encode as base64
-    with open(path, "rb") as f:
-        content_bytes = f.read()
-        content_base64 = base64.b64encode(content_bytes).decode("utf-8")
-    print(json.dumps({{"content": content_base64, "encoding": "base64"}}))
-"""
+        # For non-images, return text or base64 in a small JSON wrapper
+        result = await pod.call_async("read", path=path)
         
-        # Execute command - write script to temp file to avoid shell escaping issues
-        import base64
-        script_b64 = base64.b64encode(python_script.encode('utf-8')).decode('utf-8')
-        command = f"echo {script_b64} | base64 -d > /tmp/preview_script.py && python3 /tmp/preview_script.py"
-        output = pod.exec_command(command)
+        if "error" in result:
+            raise HTTPException(status_code=404, detail=result["error"])
         
-        # Parse JSON from output
-        try:
-            # Clean up the output
-            output_lines = output.strip().split('\n')
-            json_str = None
-            for line in reversed(output_lines):
-                line = line.strip()
-                if line.startswith('{') and line.endswith('}'):
-                    json_str = line
-                    break
-            
-            if not json_str:
-                import re
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', output, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0)
-            
-            if not json_str:
-                raise HTTPException(status_code=500, detail=f"No JSON found in output: {output[:200]}")
-            
-            # Try to parse as JSON first
-            try:
-                result = json.loads(json_str)
-            except json.JSONDecodeError:
-                import ast
-                try:
-                    result = ast.literal_eval(json_str)
-                except (ValueError, SyntaxError):
-                    fixed_json = json_str.replace("'", '"')
-                    result = json.loads(fixed_json)
-            
-            if "error" in result:
-                raise HTTPException(status_code=404, detail=result["error"])
-            
-            # For images, return binary content with proper headers
-            if is_image and result.get("encoding") == "base64":
-                import base64
-                image_bytes = base64.b64decode(result["content"])
-                
-                # Determine content type based on extension
-                content_type = "image/png"  # default
-                if path.lower().endswith('.jpg') or path.lower().endswith('.jpeg'):
-                    content_type = "image/jpeg"
-                elif path.lower().endswith('.gif'):
-                    content_type = "image/gif"
-                elif path.lower().endswith('.svg'):
-                    content_type = "image/svg+xml"
-                elif path.lower().endswith('.webp'):
-                    content_type = "image/webp"
-                elif path.lower().endswith('.bmp'):
-                    content_type = "image/bmp"
-                elif path.lower().endswith('.ico'):
-                    content_type = "image/x-icon"
-                
-                from fastapi.responses import Response
-                return Response(content=image_bytes, media_type=content_type)
-            
-            # For non-images, return JSON
-            return result
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to parse output: {str(e)}. Output: {output[:500]}")
+        return result
     
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
 
@@ -2523,24 +2517,14 @@ async def copy_pv_file(source_path: str, destination_path: str):
         # Use persistent pod for fast execution
         pod = get_persistent_pv_pod()
         
-        # Escape paths for shell command
-        escaped_source = source_path.replace("'", "'\"'\"'")
-        escaped_dest = destination_path.replace("'", "'\"'\"'")
-        
-        # Execute copy command and set permissions to be readable by all
-        copy_command = f"cp '{escaped_source}' '{escaped_dest}' && chmod 644 '{escaped_dest}'"
-        output = pod.exec_command(copy_command)
-        
-        # Check if copy was successful (cp doesn't output on success, but errors go to stderr)
-        if output and "error" in output.lower():
-            raise HTTPException(status_code=500, detail=f"Copy failed: {output}")
+        # Copies and sets permissions to be readable by all; a failed copy raises
+        await pod.call_async("copy", source=source_path, destination=destination_path)
         
         return {"status": "success", "source": source_path, "destination": destination_path}
     
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error copying file: {str(e)}")
 
@@ -2570,143 +2554,40 @@ async def upload_pv_file(
         # Use persistent pod for fast execution
         pod = get_persistent_pv_pod()
         
-        # Determine final file path
+        # dest_path is treated as the target directory
         filename = file.filename or "uploaded_file"
-        print(f"Upload request: filename={filename}, dest_path={dest_path}")
+        logger.debug("Upload request: filename=%s, dest_path=%s", filename, dest_path)
         
-        # Ensure dest_path is a directory (ends with /) or handle it
-        if dest_path.endswith("/"):
-            final_path = f"{dest_path}{filename}"
-        else:
-            # Check if dest_path is a file or directory
-            # For simplicity, assume it's a directory if it doesn't have an extension
-            # or if it's a known directory path
-            final_path = f"{dest_path}/{filename}"
-        
-        print(f"Final file path: {final_path}")
-        
-        # Escape path for shell command
-        escaped_path = final_path.replace("'", "'\"'\"'")
-        
-        # Check if file already exists and handle duplicates
-        check_command = f"test -f '{escaped_path}' && echo 'exists' || echo 'not_exists'"
-        check_output = pod.exec_command(check_command).strip()
-        
-        if check_output == "exists":
-            # File exists, add number suffix
-            base_name = filename.rsplit('.', 1)[0] if '.' in filename else filename
-            extension = '.' + filename.rsplit('.', 1)[1] if '.' in filename else ''
-            counter = 1
-            while True:
-                new_filename = f"{base_name}_{counter}{extension}"
-                # Use dest_path (which may have been normalized) instead of destination_path
-                dir_part = dest_path.rstrip('/') if not dest_path.endswith('/') else dest_path.rstrip('/')
-                new_path = f"{dir_part}/{new_filename}"
-                escaped_new_path = new_path.replace("'", "'\"'\"'")
-                check_output = pod.exec_command(f"test -f '{escaped_new_path}' && echo 'exists' || echo 'not_exists'").strip()
-                if check_output != "exists":
-                    final_path = new_path
-                    escaped_path = escaped_new_path
-                    break
-                counter += 1
-        
-        # Read file content
-        file_content = await file.read()
-        print(f"File size: {len(file_content)} bytes")
-        
-        # Encode file content as base64 for safe transfer through shell
-        import base64
-        file_content_b64 = base64.b64encode(file_content).decode('utf-8')
-        print(f"Base64 encoded size: {len(file_content_b64)} characters")
-        
-        # Create directory if it doesn't exist
-        dir_path = '/'.join(final_path.split('/')[:-1])
-        escaped_dir = dir_path.replace("'", "'\"'\"'")
-        pod.exec_command(f"mkdir -p '{escaped_dir}'")
-        
-        # Write file using base64 decode in the pod
-        # Use a two-step approach: first write base64 to temp file, then decode it
-        # This avoids shell command line length limits
-        b64_temp_path = f"/tmp/upload_{uuid.uuid4().hex[:8]}.b64"
-        escaped_b64_temp = b64_temp_path.replace("'", "'\"'\"'")
-        
-        # Step 1: Write base64 data to temp file in pod using heredoc
-        # This is more reliable than embedding in Python script for large files
-        write_b64_cmd = f"cat > '{escaped_b64_temp}' << 'EOFB64'\n{file_content_b64}\nEOFB64"
-        print(f"Writing base64 data to temp file in pod...")
-        write_output = pod.exec_command(write_b64_cmd)
-        if write_output and "error" in write_output.lower():
-            print(f"Warning writing base64 file: {write_output}")
-        
-        # Step 2: Decode base64 and write actual file
-        decode_script = f"""
-import base64
-import os
-
-b64_file = '{escaped_b64_temp}'
-file_path = '{escaped_path}'
-
-try:
-    with open(b64_file, 'r') as f:
-        file_content_b64 = f.read()
-    
-    file_content = base64.b64decode(file_content_b64)
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, 'wb') as f:
-        f.write(file_content)
-    
-    # Set permissions to be readable by all (644 = rw-r--r--)
-    os.chmod(file_path, 0o644)
-    
-    # Clean up temp file
-    os.remove(b64_file)
-    print("success")
-except Exception as e:
-    print(f"error: {{str(e)}}")
-    # Try to clean up temp file even on error
-    try:
-        os.remove(b64_file)
-    except:
-        pass
-    import sys
-    sys.exit(1)
-"""
-        script_b64 = base64.b64encode(decode_script.encode('utf-8')).decode('utf-8')
-        upload_command = f"echo {script_b64} | base64 -d > /tmp/upload_script.py && python3 /tmp/upload_script.py"
-        print(f"Executing upload command in pod...")
-        output = pod.exec_command(upload_command)
-        print(f"Upload command output: {output[:500]}")  # Log first 500 chars
-        
-        # Check for errors in output
-        if "success" not in output:
-            # Check if file was actually created despite the message
-            verify_command = f"test -f '{escaped_path}' && echo 'file_exists' || echo 'file_not_exists'"
-            verify_output = pod.exec_command(verify_command).strip()
-            if verify_output != "file_exists":
-                print(f"Upload script output: {output}")
-                print(f"File path attempted: {final_path}")
-                raise HTTPException(status_code=500, detail=f"Upload failed: {output}")
-            else:
-                # File exists, so upload succeeded despite message
-                print(f"Upload succeeded (file exists), but script output: {output}")
-        else:
-            # Verify file was created
-            verify_command = f"test -f '{escaped_path}' && echo 'file_exists' || echo 'file_not_exists'"
-            verify_output = pod.exec_command(verify_command).strip()
-            if verify_output != "file_exists":
-                raise HTTPException(status_code=500, detail=f"Upload reported success but file not found at {final_path}")
+        # One worker call creates the file under a free name (adding a _N suffix to duplicates)
+        final_path = (await pod.call_async("reserve", directory=dest_path.rstrip("/"), name=filename))["path"]
+        logger.debug("Final file path: %s", final_path)
+        
+        # Stream the upload straight from its spooled temp file; the size goes in the tar header
+        source = file.file
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(0)
+        logger.debug("File size: %s bytes", size)
+        
+        # Fills in the reserved file; raises if tar does not exit cleanly
+        dir_path, _, name = final_path.rpartition("/")
+        try:
+            await asyncio.to_thread(pod.write_file, dir_path, name, source, size)
+        except Exception:
+            # Don't leave the empty placeholder behind
+            await pod.call_async("rm", path=final_path)
+            raise
         
         # Return in SVAR recommended format
         return {
             "name": filename,
             "path": final_path,
-            "size": len(file_content)
+            "size": size
         }
     
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
@@ -2716,18 +2597,15 @@ except Exception as e:
 # ============================================================================
 
 @app.post("/api/v1/flows")
-async def create_flow(request: FlowCreateRequest, db: Session = Depends(get_db)):
+def create_flow(request: FlowCreateRequest, db: Session = Depends(get_db)):
     """Create a new flow definition."""
     try:
-        # Generate flow ID
-        flow_id = f"flow-{uuid.uuid4().hex[:12]}"
-        
         # Debug logging
-        print(f"Creating flow: {request.name}")
-        print(f"Number of steps received: {len(request.steps)}")
-        print(f"Number of edges received: {len(request.edges)}")
+        logger.debug("Creating flow: %s", request.name)
+        logger.debug("Number of steps received: %s", len(request.steps))
+        logger.debug("Number of edges received: %s", len(request.edges))
         if request.steps:
-            print(f"First step: {request.steps[0].model_dump()}")
+            logger.debug("First step: %s", request.steps[0].model_dump())
         
         # Build definition from request
         definition = {
@@ -2737,18 +2615,16 @@ async def create_flow(request: FlowCreateRequest, db: Session = Depends(get_db))
         
         # Create flow record
         flow = Flow(
-            id=flow_id,
             name=request.name,
             description=request.description,
             definition=definition,
             status="draft"
         )
         db.add(flow)
-        db.commit()
-        db.refresh(flow)
+        db.commit()  # Generated id and timestamps come back via INSERT ... RETURNING
         
         return {
-            "id": flow_id,
+            "id": flow.id,
             "name": flow.name,
             "description": flow.description,
             "steps": definition["steps"],
@@ -2759,7 +2635,6 @@ async def create_flow(request: FlowCreateRequest, db: Session = Depends(get_db))
         }
     except Exception as e:
         db.rollback()
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to create flow: {str(e)}")
     finally:
@@ -2767,7 +2642,7 @@ async def create_flow(request: FlowCreateRequest, db: Session = Depends(get_db))
 
 
 @app.get("/api/v1/flows")
-async def list_flows(db: Session = Depends(get_db)):
+def list_flows(db: Session = Depends(get_db)):
     """List all flows."""
     try:
         flows = db.query(Flow).order_by(Flow.updated_at.desc()).all()
@@ -2786,7 +2661,6 @@ async def list_flows(db: Session = Depends(get_db)):
             ]
         }
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to list flows: {str(e)}")
     finally:
@@ -2794,7 +2668,7 @@ async def list_flows(db: Session = Depends(get_db)):
 
 
 @app.get("/api/v1/flows/{flow_id}")
-async def get_flow(flow_id: str, db: Session = Depends(get_db)):
+def get_flow(flow_id: str, db: Session = Depends(get_db)):
     """Get flow definition."""
     try:
         flow = db.query(Flow).filter(Flow.id == flow_id).first()
@@ -2816,7 +2690,6 @@ async def get_flow(flow_id: str, db: Session = Depends(get_db)):
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to get flow: {str(e)}")
     finally:
@@ -2824,7 +2697,7 @@ async def get_flow(flow_id: str, db: Session = Depends(get_db)):
 
 
 @app.put("/api/v1/flows/{flow_id}")
-async def update_flow(flow_id: str, request: FlowUpdateRequest, db: Session = Depends(get_db)):
+def update_flow(flow_id: str, request: FlowUpdateRequest, db: Session = Depends(get_db)):
     """Update flow definition."""
     try:
         flow = db.query(Flow).filter(Flow.id == flow_id).first()
@@ -2840,11 +2713,11 @@ async def update_flow(flow_id: str, request: FlowUpdateRequest, db: Session = De
         # Update definition if steps or edges provided
         if request.steps is not None or request.edges is not None:
             # Debug logging
-            print(f"Updating flow: {flow_id}")
-            print(f"Number of steps received: {len(request.steps) if request.steps else 0}")
-            print(f"Number of edges received: {len(request.edges) if request.edges else 0}")
+            logger.debug("Updating flow: %s", flow_id)
+            logger.debug("Number of steps received: %s", len(request.steps) if request.steps else 0)
+            logger.debug("Number of edges received: %s", len(request.edges) if request.edges else 0)
             if request.steps:
-                print(f"First step: {request.steps[0].model_dump()}")
+                logger.debug("First step: %s", request.steps[0].model_dump())
             
             definition = flow.definition if isinstance(flow.definition, dict) else {}
             if request.steps is not None:
@@ -2855,7 +2728,6 @@ async def update_flow(flow_id: str, request: FlowUpdateRequest, db: Session = De
         
         flow.updated_at = datetime.utcnow()
         db.commit()
-        db.refresh(flow)
         
         definition = flow.definition if isinstance(flow.definition, dict) else {}
         
@@ -2873,7 +2745,6 @@ async def update_flow(flow_id: str, request: FlowUpdateRequest, db: Session = De
         raise
     except Exception as e:
         db.rollback()
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to update flow: {str(e)}")
     finally:
@@ -2881,7 +2752,7 @@ async def update_flow(flow_id: str, request: FlowUpdateRequest, db: Session = De
 
 
 @app.delete("/api/v1/flows/{flow_id}")
-async def delete_flow(flow_id: str, db: Session = Depends(get_db)):
+def delete_flow(flow_id: str, db: Session = Depends(get_db)):
     """Delete flow."""
     try:
         flow = db.query(Flow).filter(Flow.id == flow_id).first()
@@ -2896,7 +2767,6 @@ async def delete_flow(flow_id: str, db: Session = Depends(get_db)):
         raise
     except Exception as e:
         db.rollback()
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to delete flow: {str(e)}")
     finally:
@@ -2908,10 +2778,10 @@ async def delete_flow(flow_id: str, db: Session = Depends(get_db)):
 # ============================================================================
 
 @app.post("/api/v1/flows/preview-template")
-async def preview_flow_template(request: FlowCreateRequest):
+def preview_flow_template(request: FlowCreateRequest):
     """Generate a preview Argo Workflow template from a flow definition without saving or running it."""
     try:
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
+        namespace = ARGO_NAMESPACE
         
         # Build flow definition from request
         flow_definition = {
@@ -2943,7 +2813,6 @@ async def preview_flow_template(request: FlowCreateRequest):
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to generate template: {str(e)}")
 
@@ -2953,10 +2822,10 @@ async def preview_flow_template(request: FlowCreateRequest):
 # ============================================================================
 
 @app.post("/api/v1/flows/{flow_id}/run")
-async def run_flow(flow_id: str, db: Session = Depends(get_db)):
+def run_flow(flow_id: str, db: Session = Depends(get_db)):
     """Run entire flow."""
     try:
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
+        namespace = ARGO_NAMESPACE
         
         # Load flow from database
         flow = db.query(Flow).filter(Flow.id == flow_id).first()
@@ -2964,9 +2833,7 @@ async def run_flow(flow_id: str, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail=f"Flow {flow_id} not found")
         
         # Check if flow already has a running workflow
-        latest_run = db.query(FlowRun).filter(
-            FlowRun.flow_id == flow_id
-        ).order_by(FlowRun.run_number.desc()).first()
+        latest_run = db.scalars(LATEST_FLOW_RUN, {"flow_id": flow_id}).first()
         
         if latest_run and latest_run.phase in ["Running", "Pending"]:
             raise HTTPException(
@@ -2989,7 +2856,7 @@ async def run_flow(flow_id: str, db: Session = Depends(get_db)):
         )
         
         # Get next run number
-        max_run = db.query(FlowRun).filter(FlowRun.flow_id == flow_id).order_by(FlowRun.run_number.desc()).first()
+        max_run = db.scalars(LATEST_FLOW_RUN, {"flow_id": flow_id}).first()
         next_run_number = (max_run.run_number + 1) if max_run else 1
         
         # Create FlowRun record
@@ -3002,7 +2869,6 @@ async def run_flow(flow_id: str, db: Session = Depends(get_db)):
         )
         db.add(flow_run)
         db.commit()
-        db.refresh(flow_run)
         
         # Create FlowStepRun records for each step
         steps = definition.get("steps", [])
@@ -3032,7 +2898,6 @@ async def run_flow(flow_id: str, db: Session = Depends(get_db)):
         raise
     except Exception as e:
         db.rollback()
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to run flow: {str(e)}")
     finally:
@@ -3040,10 +2905,10 @@ async def run_flow(flow_id: str, db: Session = Depends(get_db)):
 
 
 @app.post("/api/v1/flows/{flow_id}/steps/{step_id}/run")
-async def run_flow_step(flow_id: str, step_id: str, db: Session = Depends(get_db)):
+def run_flow_step(flow_id: str, step_id: str, db: Session = Depends(get_db)):
     """Run a single step from a flow (for testing)."""
     try:
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
+        namespace = ARGO_NAMESPACE
         
         # Load flow from database
         flow = db.query(Flow).filter(Flow.id == flow_id).first()
@@ -3080,7 +2945,6 @@ async def run_flow_step(flow_id: str, step_id: str, db: Session = Depends(get_db
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to run step: {str(e)}")
     finally:
@@ -3088,10 +2952,10 @@ async def run_flow_step(flow_id: str, step_id: str, db: Session = Depends(get_db
 
 
 @app.get("/api/v1/flows/{flow_id}/runs")
-async def list_flow_runs(flow_id: str, db: Session = Depends(get_db)):
+def list_flow_runs(flow_id: str, db: Session = Depends(get_db)):
     """List all runs for a flow."""
     try:
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
+        namespace = ARGO_NAMESPACE
         
         flow = db.query(Flow).filter(Flow.id == flow_id).first()
         if not flow:
@@ -3103,7 +2967,7 @@ async def list_flow_runs(flow_id: str, db: Session = Depends(get_db)):
         
         # Update phases for runs that are still pending or running
         try:
-            custom_api = CustomObjectsApi()
+            custom_api = CustomObjectsApi(k8s_api_client())
             for run in runs:
                 if run.phase in ["Pending", "Running"]:
                     try:
@@ -3120,16 +2984,16 @@ async def list_flow_runs(flow_id: str, db: Session = Depends(get_db)):
                         if run.phase != current_workflow_phase:
                             run.phase = current_workflow_phase
                             if status.get("startedAt"):
-                                run.started_at = datetime.fromisoformat(status.get("startedAt").replace("Z", "+00:00"))
+                                run.started_at = parse_k8s_timestamp(status["startedAt"])
                             if status.get("finishedAt"):
-                                run.finished_at = datetime.fromisoformat(status.get("finishedAt").replace("Z", "+00:00"))
+                                run.finished_at = parse_k8s_timestamp(status["finishedAt"])
                     except Exception as e:
-                        print(f"Could not fetch workflow status for {run.workflow_id}: {e}")
+                        logger.warning("Could not fetch workflow status for %s: %s", run.workflow_id, e)
                         # Continue with database value if workflow query fails
             
             db.commit()
         except Exception as e:
-            print(f"Error updating flow run statuses: {e}")
+            logger.error("Error updating flow run statuses: %s", e)
             # Continue with database values if update fails
         
         return {
@@ -3149,7 +3013,6 @@ async def list_flow_runs(flow_id: str, db: Session = Depends(get_db)):
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to list flow runs: {str(e)}")
     finally:
@@ -3157,10 +3020,10 @@ async def list_flow_runs(flow_id: str, db: Session = Depends(get_db)):
 
 
 @app.get("/api/v1/flows/{flow_id}/runs/{run_number}")
-async def get_flow_run(flow_id: str, run_number: int, db: Session = Depends(get_db)):
+def get_flow_run(flow_id: str, run_number: int, db: Session = Depends(get_db)):
     """Get flow run details."""
     try:
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
+        namespace = ARGO_NAMESPACE
         
         flow = db.query(Flow).filter(Flow.id == flow_id).first()
         if not flow:
@@ -3180,7 +3043,7 @@ async def get_flow_run(flow_id: str, run_number: int, db: Session = Depends(get_
         # Update flow run phase from Argo Workflows
         try:
             from kubernetes.client import CustomObjectsApi
-            custom_api = CustomObjectsApi()
+            custom_api = CustomObjectsApi(k8s_api_client())
             
             workflow = custom_api.get_namespaced_custom_object(
                 group="argoproj.io",
@@ -3196,20 +3059,18 @@ async def get_flow_run(flow_id: str, run_number: int, db: Session = Depends(get_
             if flow_run.phase != current_workflow_phase:
                 flow_run.phase = current_workflow_phase
                 if status.get("startedAt"):
-                    flow_run.started_at = datetime.fromisoformat(status.get("startedAt").replace("Z", "+00:00"))
+                    flow_run.started_at = parse_k8s_timestamp(status["startedAt"])
                 if status.get("finishedAt"):
-                    flow_run.finished_at = datetime.fromisoformat(status.get("finishedAt").replace("Z", "+00:00"))
+                    flow_run.finished_at = parse_k8s_timestamp(status["finishedAt"])
                 db.commit()
             
             # Update step run phases from workflow nodes
             nodes = status.get("nodes", {})
-            step_runs = db.query(FlowStepRun).filter(
-                FlowStepRun.flow_run_id == flow_run.id
-            ).all()
+            step_runs = flow_run.step_runs
             
             # Debug: print available node IDs
             if nodes:
-                print(f"Available workflow node IDs: {list(nodes.keys())[:10]}")
+                logger.debug("Available workflow node IDs: %s", list(nodes.keys())[:10])
             
             for step_run in step_runs:
                 # Find corresponding node in workflow
@@ -3240,7 +3101,7 @@ async def get_flow_run(flow_id: str, run_number: int, db: Session = Depends(get_
                                 node_info = node_data
                                 # Update workflow_node_id for future lookups
                                 step_run.workflow_node_id = node_key
-                                print(f"Matched step {node_id} to workflow node {node_key}")
+                                logger.debug("Matched step %s to workflow node %s", node_id, node_key)
                                 break
                 
                 if node_info:
@@ -3257,24 +3118,22 @@ async def get_flow_run(flow_id: str, run_number: int, db: Session = Depends(get_
                         mapped_phase = "Pending"
                     
                     if step_run.phase != mapped_phase:
-                        print(f"Updating step {step_run.step_id} phase from {step_run.phase} to {mapped_phase}")
+                        logger.info("Updating step %s phase from %s to %s", step_run.step_id, step_run.phase, mapped_phase)
                         step_run.phase = mapped_phase
                         if node_info.get("startedAt"):
-                            step_run.started_at = datetime.fromisoformat(node_info.get("startedAt").replace("Z", "+00:00"))
+                            step_run.started_at = parse_k8s_timestamp(node_info["startedAt"])
                         if node_info.get("finishedAt"):
-                            step_run.finished_at = datetime.fromisoformat(node_info.get("finishedAt").replace("Z", "+00:00"))
+                            step_run.finished_at = parse_k8s_timestamp(node_info["finishedAt"])
                 else:
-                    print(f"Warning: Could not find workflow node for step {step_run.step_id} (looking for {node_id})")
+                    logger.warning("Could not find workflow node for step %s (looking for %s)", step_run.step_id, node_id)
             
             db.commit()
         except Exception as e:
-            print(f"Could not fetch workflow status for {flow_run.workflow_id}: {e}")
+            logger.warning("Could not fetch workflow status for %s: %s", flow_run.workflow_id, e)
             # Continue with database values if workflow query fails
         
-        # Refresh step runs after potential updates
-        step_runs = db.query(FlowStepRun).filter(
-            FlowStepRun.flow_run_id == flow_run.id
-        ).all()
+        # Step runs reflect any updates above (reloaded in one query if expired by commit)
+        step_runs = flow_run.step_runs
         
         return {
             "id": flow_run.id,
@@ -3300,7 +3159,6 @@ async def get_flow_run(flow_id: str, run_number: int, db: Session = Depends(get_
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to get flow run: {str(e)}")
     finally:
@@ -3308,14 +3166,17 @@ async def get_flow_run(flow_id: str, run_number: int, db: Session = Depends(get_
 
 
 @app.get("/api/v1/flows/{flow_id}/runs/{run_number}/logs")
-async def get_flow_run_logs(flow_id: str, run_number: int, db: Session = Depends(get_db)):
+def get_flow_run_logs(flow_id: str, run_number: int, db: Session = Depends(get_db)):
     """Get logs for a flow run."""
     try:
         flow = db.query(Flow).filter(Flow.id == flow_id).first()
         if not flow:
             raise HTTPException(status_code=404, detail=f"Flow {flow_id} not found")
         
-        flow_run = db.query(FlowRun).filter(
+        # Load step runs and all their logs up front (one IN query each, not one per step)
+        flow_run = db.query(FlowRun).options(
+            selectinload(FlowRun.step_runs).selectinload(FlowStepRun.logs).undefer(FlowStepLog.logs)
+        ).filter(
             FlowRun.flow_id == flow_id,
             FlowRun.run_number == run_number
         ).first()
@@ -3326,18 +3187,9 @@ async def get_flow_run_logs(flow_id: str, run_number: int, db: Session = Depends
                 detail=f"Flow run {run_number} not found for flow {flow_id}"
             )
         
-        # Get step runs and their logs
-        step_runs = db.query(FlowStepRun).filter(
-            FlowStepRun.flow_run_id == flow_run.id
-        ).all()
-        
         logs = []
-        for step_run in step_runs:
-            step_logs = db.query(FlowStepLog).filter(
-                FlowStepLog.step_run_id == step_run.id
-            ).order_by(FlowStepLog.created_at).all()
-            
-            for log_entry in step_logs:
+        for step_run in flow_run.step_runs:
+            for log_entry in step_run.logs:
                 logs.append({
                     "stepId": step_run.step_id,
                     "node": log_entry.node_id,
@@ -3350,7 +3202,6 @@ async def get_flow_run_logs(flow_id: str, run_number: int, db: Session = Depends
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to get flow run logs: {str(e)}")
     finally:
@@ -3358,10 +3209,10 @@ async def get_flow_run_logs(flow_id: str, run_number: int, db: Session = Depends
 
 
 @app.get("/api/v1/flows/{flow_id}/runs/{run_number}/template")
-async def get_flow_run_template(flow_id: str, run_number: int, db: Session = Depends(get_db)):
+def get_flow_run_template(flow_id: str, run_number: int, db: Session = Depends(get_db)):
     """Get the Argo Workflow YAML template for a flow run."""
     try:
-        namespace = os.getenv("ARGO_NAMESPACE", "argo")
+        namespace = ARGO_NAMESPACE
         
         flow = db.query(Flow).filter(Flow.id == flow_id).first()
         if not flow:
@@ -3387,7 +3238,7 @@ async def get_flow_run_template(flow_id: str, run_number: int, db: Session = Dep
         # Fetch workflow from Kubernetes
         try:
             from kubernetes.client import CustomObjectsApi
-            custom_api = CustomObjectsApi()
+            custom_api = CustomObjectsApi(k8s_api_client())
             
             workflow = custom_api.get_namespaced_custom_object(
                 group="argoproj.io",
@@ -3411,7 +3262,6 @@ async def get_flow_run_template(flow_id: str, run_number: int, db: Session = Dep
                 "yaml": yaml_str
             }
         except Exception as k8s_error:
-            import traceback
             traceback.print_exc()
             raise HTTPException(
                 status_code=500,
@@ -3420,7 +3270,6 @@ async def get_flow_run_template(flow_id: str, run_number: int, db: Session = Dep
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to get flow run template: {str(e)}")
     finally:
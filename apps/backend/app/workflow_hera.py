@@ -9,13 +9,64 @@ Usage:
 2. Use create_workflow_with_hera() in your workflow creation logic
 """
 
+import functools
+import logging
 import os
+import time
 from typing import Optional
 from hera.workflows import Workflow, Script, Container, Parameter
 from hera.workflows.models import VolumeMount, Volume, EnvVar, PersistentVolumeClaimVolumeSource
-from kubernetes.client import CoreV1Api, CustomObjectsApi  # type: ignore
+from kubernetes.client import ApiClient, Configuration, CoreV1Api, CustomObjectsApi  # type: ignore
 from fastapi import HTTPException
 
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def k8s_api_client() -> ApiClient:
+    """One ApiClient (and urllib3 connection pool) shared by every API object in the process."""
+    configuration = Configuration.get_default_copy()
+    # Log reads in main fan out over a thread pool and handlers run in FastAPI's threadpool;
+    # size the pool so concurrent calls reuse connections instead of discarding them
+    configuration.connection_pool_maxsize = max(configuration.connection_pool_maxsize or 0, 32)
+    return ApiClient(configuration)
+
+
+# A Bound claim rarely changes state, so a positive check is reused for a short while
+PVC_STATUS_CACHE_TTL = float(os.getenv("PVC_STATUS_CACHE_TTL", "30"))
+_pvc_bound_until: dict[tuple[str, str], float] = {}
+
+
+def check_pvc_bound(namespace: str, name: str = "task-results-pvc") -> None:
+    """
+    Raise HTTPException(400) unless the PVC exists and is Bound.
+    Bound results are cached for PVC_STATUS_CACHE_TTL seconds; anything else is re-checked
+    on the next call. Other API errors are logged and treated as transient.
+    """
+    key = (namespace, name)
+    if _pvc_bound_until.get(key, 0.0) > time.monotonic():
+        return
+    
+    try:
+        pvc = CoreV1Api(k8s_api_client()).read_namespaced_persistent_volume_claim(name=name, namespace=namespace)
+        pvc_status = pvc.status.phase if pvc.status else "Unknown"
+        if pvc_status != "Bound":
+            raise HTTPException(
+                status_code=400,
+                detail=f"PVC '{name}' is not bound. Current status: {pvc_status}. Please ensure the PV is available."
+            )
+        _pvc_bound_until[key] = time.monotonic() + PVC_STATUS_CACHE_TTL
+    except Exception as pvc_error:
+        # If PVC doesn't exist, that's also a problem
+        if "404" in str(pvc_error) or "Not Found" in str(pvc_error):
+            raise HTTPException(
+                status_code=400,
+                detail=f"PVC '{name}' not found. Please create it first using: kubectl apply -f infrastructure/k8s/pv.yaml"
+            )
+        if isinstance(pvc_error, HTTPException):
+            raise pvc_error
+        # Otherwise log and continue (might be a transient issue)
+        logger.warning("Could not verify PVC status: %s", pvc_error)
 
 def build_script_source(
     dependencies: Optional[str] = None,
@@ -103,28 +154,8 @@ def create_workflow_with_hera(
     Raises:
         HTTPException: If workflow creation fails
     """
-    # Validate PVC exists (same validation as current code)
-    core_api = CoreV1Api()
-    try:
-        pvc = core_api.read_namespaced_persistent_volume_claim(
-            name="task-results-pvc",
-            namespace=namespace
-        )
-        pvc_status = pvc.status.phase if pvc.status else "Unknown"
-        if pvc_status != "Bound":
-            raise HTTPException(
-                status_code=400,
-                detail=f"PVC 'task-results-pvc' is not bound. Current status: {pvc_status}."
-            )
-    except Exception as pvc_error:
-        if "404" in str(pvc_error) or "Not Found" in str(pvc_error):
-            raise HTTPException(
-                status_code=400,
-                detail="PVC 'task-results-pvc' not found. Please create it first."
-            )
-        if isinstance(pvc_error, HTTPException):
-            raise pvc_error
-        print(f"Warning: Could not verify PVC status: {pvc_error}")
+    # Validate PVC exists and is bound
+    check_pvc_bound(namespace)
     
     # Determine if we need dependencies handling
     has_dependencies = bool(dependencies or requirements_file)
@@ -217,7 +248,7 @@ def create_workflow_with_hera(
                 workflow_dict = dict(workflow_obj) if hasattr(workflow_obj, '__dict__') else {}
         
         # Submit workflow via Kubernetes CustomObjectsApi
-        api_instance = CustomObjectsApi()
+        api_instance = CustomObjectsApi(k8s_api_client())
         result = api_instance.create_namespaced_custom_object(
             group="argoproj.io",
             version="v1alpha1",
@@ -7,11 +7,15 @@ using Hera SDK, extending the single-step workflow functionality.
 
 import os
 import json
+import logging
 from typing import Optional, Dict, List, Set
 from hera.workflows import Workflow, Script, Container, DAG, Task
 from hera.workflows.models import VolumeMount, Volume, EnvVar, PersistentVolumeClaimVolumeSource
-from kubernetes.client import CoreV1Api, CustomObjectsApi  # type: ignore
+from kubernetes.client import CustomObjectsApi  # type: ignore
 from fastapi import HTTPException
+from app.workflow_hera import check_pvc_bound, k8s_api_client
+
+logger = logging.getLogger(__name__)
 
 
 def build_step_script_source(
@@ -138,28 +142,8 @@ def create_flow_workflow_with_hera(
     Raises:
         HTTPException: If workflow creation fails
     """
-    # Validate PVC exists
-    core_api = CoreV1Api()
-    try:
-        pvc = core_api.read_namespaced_persistent_volume_claim(
-            name="task-results-pvc",
-            namespace=namespace
-        )
-        pvc_status = pvc.status.phase if pvc.status else "Unknown"
-        if pvc_status != "Bound":
-            raise HTTPException(
-                status_code=400,
-                detail=f"PVC 'task-results-pvc' is not bound. Current status: {pvc_status}."
-            )
-    except Exception as pvc_error:
-        if "404" in str(pvc_error) or "Not Found" in str(pvc_error):
-            raise HTTPException(
-                status_code=400,
-                detail="PVC 'task-results-pvc' not found. Please create it first."
-            )
-        if isinstance(pvc_error, HTTPException):
-            raise pvc_error
-        print(f"Warning: Could not verify PVC status: {pvc_error}")
+    # Validate PVC exists and is bound
+    check_pvc_bound(namespace)
     
     # Extract steps and edges from definition
     steps = flow_definition.get("steps", [])
@@ -338,7 +322,7 @@ def create_flow_workflow_with_hera(
                 workflow_dict = dict(workflow_obj) if hasattr(workflow_obj, '__dict__') else {}
         
         # Submit workflow via Kubernetes CustomObjectsApi
-        api_instance = CustomObjectsApi()
+        api_instance = CustomObjectsApi(k8s_api_client())
         result = api_instance.create_namespaced_custom_object(
             group="argoproj.io",
             version="v1alpha1",
@@ -562,11 +546,11 @@ def generate_flow_workflow_template(
     # Templates should be in spec.templates for Argo Workflows
     if 'spec' in workflow_dict and 'templates' in workflow_dict['spec']:
         template_count = len(workflow_dict['spec']['templates'])
-        print(f"Generated workflow has {template_count} templates (expected {len(steps) + 1} = {len(steps)} steps + 1 DAG)")
+        logger.debug("Generated workflow has %d templates (expected %d = %d steps + 1 DAG)", template_count, len(steps) + 1, len(steps))
     else:
-        print(f"Warning: Templates not found in expected location. Workflow dict keys: {workflow_dict.keys()}")
+        logger.warning("Templates not found in expected location. Workflow dict keys: %s", workflow_dict.keys())
         if 'spec' in workflow_dict:
-            print(f"Spec keys: {workflow_dict['spec'].keys()}")
+            logger.warning("Spec keys: %s", workflow_dict['spec'].keys())
     
     return workflow_dict
 
@@ -7,6 +7,7 @@ cd "$(dirname "$0")"
 
 # Set feature flag (default to false if not set)
 export USE_HERA_SDK="${USE_HERA_SDK:-false}"
+export RUN_MIGRATIONS="${RUN_MIGRATIONS:-1}"
 
 echo "Starting backend development server..."
 echo "USE_HERA_SDK=$USE_HERA_SDK"
@@ -0,0 +1,93 @@
+"""
+Shared setup for the backend unit tests.
+
+The app modules connect to Kubernetes and build the database engine at import time, so the
+environment is pointed at a throwaway kubeconfig (never contacted) and a temporary SQLite
+file before anything from ``app`` is imported. SQLite stands in for Postgres through a few
+compile hooks and SQL functions matching the server defaults in the models.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+import pytest
+
+_tmp_dir = tempfile.mkdtemp(prefix="backend-tests-")
+_kubeconfig = os.path.join(_tmp_dir, "kubeconfig")
+with open(_kubeconfig, "w") as f:
+    f.write("""apiVersion: v1
+kind: Config
+clusters:
+- cluster: {server: "https://kubernetes.invalid:6443"}
+  name: test
+contexts:
+- context: {cluster: test, user: test}
+  name: test
+current-context: test
+users:
+- name: test
+  user: {token: test}
+""")
+os.environ["KUBECONFIG"] = _kubeconfig
+os.environ["KUBERNETES_CLUSTER_TYPE"] = "external"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}"
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import BigInteger, event  # noqa: E402
+from sqlalchemy.dialects.postgresql import JSONB  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+
+from app import database  # noqa: E402
+
+# Integration scripts that need a running backend and cluster; run them directly instead
+collect_ignore = ["test_hera_integration.py"]
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(BigInteger, "sqlite")
+def _compile_bigint(type_, compiler, **kw):
+    # Only INTEGER PRIMARY KEY autoincrements in SQLite
+    return "INTEGER"
+
+
+@event.listens_for(database.engine, "connect")
+def _register_postgres_functions(dbapi_connection, connection_record):
+    dbapi_connection.create_function("now", 0, lambda: datetime.utcnow().isoformat(" "))
+    dbapi_connection.create_function("timezone", 2, lambda zone, value: value)
+    dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+
+# The generated-id default is Postgres syntax (::text); tests give tasks explicit ids
+database.Task.__table__.c.id.server_default = None
+
+_TEST_TABLES = [database.Task.__table__, database.TaskRun.__table__, database.TaskLog.__table__]
+
+
+@pytest.fixture
+def db():
+    """Session on freshly created task tables."""
+    database.Base.metadata.drop_all(database.engine, tables=_TEST_TABLES)
+    database.Base.metadata.create_all(database.engine, tables=_TEST_TABLES)
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def task_run(db):
+    """A task with one running run."""
+    db.add(database.Task(id="task-1", python_code="print('hi')"))
+    db.flush()
+    run = database.TaskRun(task_id="task-1", workflow_id="wf-1", run_number=1, phase="Running", python_code="print('hi')")
+    db.add(run)
+    db.commit()
+    return run
@@ -0,0 +1,75 @@
+"""ETag revalidation of GET /api/v1/tasks/{task_id}."""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import database, main
+
+
+@pytest.fixture
+def client(task_run):
+    return TestClient(main.app)
+
+
+def test_get_task_sends_an_etag(client):
+    response = client.get("/api/v1/tasks/task-1")
+
+    assert response.status_code == 200
+    assert response.headers["etag"].startswith('"')
+    assert response.json()["runs"][0]["pythonCode"] == "print('hi')"
+
+
+@pytest.mark.parametrize("if_none_match", [
+    "{etag}",
+    "W/{etag}",
+    '"stale", {etag}',
+    '"stale",W/{etag} , "other"',
+    "*",
+])
+def test_matching_if_none_match_gets_304(client, if_none_match):
+    etag = client.get("/api/v1/tasks/task-1").headers["etag"]
+
+    response = client.get("/api/v1/tasks/task-1", headers={"If-None-Match": if_none_match.format(etag=etag)})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+@pytest.mark.parametrize("if_none_match", ['"stale"', '"stale", W/"other"', ""])
+def test_other_tags_get_the_body(client, if_none_match):
+    response = client.get("/api/v1/tasks/task-1", headers={"If-None-Match": if_none_match})
+
+    assert response.status_code == 200
+    assert response.json()["id"] == "task-1"
+
+
+def test_etag_changes_with_the_run_phase(client, db, task_run):
+    etag = client.get("/api/v1/tasks/task-1").headers["etag"]
+    task_run.phase = "Succeeded"
+    db.commit()
+
+    response = client.get("/api/v1/tasks/task-1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["runs"][0]["phase"] == "Succeeded"
+
+
+def test_not_modified_skips_loading_the_code(client):
+    etag = client.get("/api/v1/tasks/task-1").headers["etag"]
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(database.engine, "before_cursor_execute", listener)
+    try:
+        response = client.get("/api/v1/tasks/task-1", headers={"If-None-Match": etag})
+    finally:
+        event.remove(database.engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 304
+    assert statements
+    assert not any("python_code" in statement for statement in statements)
+
+
+def test_missing_task_is_404(client):
+    assert client.get("/api/v1/tasks/missing").status_code == 404
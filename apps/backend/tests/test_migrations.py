@@ -0,0 +1,57 @@
+"""Guards around the CREATE INDEX CONCURRENTLY schema revisions."""
+import pytest
+
+from app.database import _SCHEMA_MIGRATIONS, _run_migration_statement
+
+UNIQUE_BUILD = "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_task_logs_run_node_pod ON task_logs (run_id, node_id, pod_name)"
+
+
+class FakeConnection:
+    """Answers the pg_index validity lookups from a script and records everything else."""
+
+    def __init__(self, validity):
+        self.validity = list(validity)
+        self.executed = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if "FROM pg_index" in sql:
+            value = self.validity.pop(0)
+            return type("Result", (), {"scalar": lambda self: value})()
+        self.executed.append(sql)
+
+
+def test_invalid_leftover_index_is_dropped_before_the_build():
+    conn = FakeConnection([False, True])
+    _run_migration_statement(conn, UNIQUE_BUILD)
+    assert conn.executed == ["DROP INDEX CONCURRENTLY IF EXISTS uq_task_logs_run_node_pod", UNIQUE_BUILD]
+
+
+def test_missing_index_is_built_without_a_drop():
+    conn = FakeConnection([None, True])
+    _run_migration_statement(conn, UNIQUE_BUILD)
+    assert conn.executed == [UNIQUE_BUILD]
+
+
+def test_index_left_invalid_by_the_build_fails_the_revision():
+    conn = FakeConnection([None, False])
+    with pytest.raises(RuntimeError, match="uq_task_logs_run_node_pod"):
+        _run_migration_statement(conn, UNIQUE_BUILD)
+
+
+def test_other_statements_run_unchecked():
+    conn = FakeConnection([])
+    _run_migration_statement(conn, "DROP INDEX CONCURRENTLY IF EXISTS ix_task_runs_task_id")
+    assert conn.executed == ["DROP INDEX CONCURRENTLY IF EXISTS ix_task_runs_task_id"]
+
+
+def test_every_concurrent_build_is_guarded():
+    builds = [
+        statement for _, statements in _SCHEMA_MIGRATIONS for statement in statements
+        if "INDEX CONCURRENTLY IF NOT EXISTS" in statement and statement.lstrip().startswith("CREATE")
+    ]
+    assert len(builds) == 8
+    for statement in builds:
+        conn = FakeConnection([None, True])
+        _run_migration_statement(conn, statement)
+        assert not conn.validity
@@ -0,0 +1,210 @@
+"""RunLogFeed: one poll loop per run, fanned out to every websocket watching it."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.main import RunLogFeed, join_run_log_feed
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def logs_message(phase: str, logs: str = "hello") -> dict:
+    return {"type": "logs", "data": [{"pod": "p", "logs": logs}], "workflow_phase": phase}
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(main, "WS_LOG_POLL_INTERVAL", 0.01)
+    main._run_log_feeds.clear()
+
+
+def script_refresh(monkeypatch, results):
+    """Make RunLogFeed.refresh return (phase, logs) from ``results``, repeating the last one."""
+    calls = []
+
+    def refresh(feed):
+        calls.append(feed)
+        phase, logs = results[min(len(calls), len(results)) - 1]
+        return phase, [{"pod": "p", "logs": logs}]
+
+    monkeypatch.setattr(RunLogFeed, "refresh", refresh)
+    return calls
+
+
+async def collect(queue: asyncio.Queue) -> list:
+    messages = []
+    while True:
+        message = await asyncio.wait_for(queue.get(), 5)
+        messages.append(message)
+        if message is None:
+            return messages
+
+
+def test_every_viewer_gets_every_update(monkeypatch):
+    calls = script_refresh(monkeypatch, [("Running", "a"), ("Running", "a"), ("Succeeded", "ab")])
+
+    async def scenario():
+        run = SimpleNamespace(id=1, workflow_id="wf-1")
+        feed, first = join_run_log_feed("task-1", run, FakeSession(), main.ARGO_NAMESPACE)
+        again, second = join_run_log_feed("task-1", run, FakeSession(), main.ARGO_NAMESPACE)
+        assert again is feed
+        return await asyncio.gather(collect(first), collect(second))
+
+    first, second = asyncio.run(scenario())
+
+    expected = [
+        logs_message("Running", "a"),
+        logs_message("Succeeded", "ab"),
+        {"type": "complete", "workflow_phase": "Succeeded"},
+        None,
+    ]
+    assert first == expected
+    assert second == expected
+    # One poll loop served both viewers, and unchanged polls were not re-sent
+    assert len(calls) == 3
+
+
+def test_second_viewer_shares_the_feed_and_its_session_is_closed(monkeypatch):
+    script_refresh(monkeypatch, [("Succeeded", "done")])
+
+    async def scenario():
+        run = SimpleNamespace(id=2, workflow_id="wf-2")
+        owner_db, joiner_db = FakeSession(), FakeSession()
+        feed, queue = join_run_log_feed("task-2", run, owner_db, main.ARGO_NAMESPACE)
+        _, other = join_run_log_feed("task-2", run, joiner_db, main.ARGO_NAMESPACE)
+        assert joiner_db.closed and not owner_db.closed
+        await asyncio.gather(collect(queue), collect(other))
+        return owner_db
+
+    owner_db = asyncio.run(scenario())
+    assert owner_db.closed
+    assert 2 not in main._run_log_feeds
+
+
+def test_late_joiner_starts_from_the_snapshot(monkeypatch):
+    script_refresh(monkeypatch, [("Running", "so far")])
+
+    async def scenario():
+        run = SimpleNamespace(id=3, workflow_id="wf-3")
+        feed, first = join_run_log_feed("task-3", run, FakeSession(), main.ARGO_NAMESPACE)
+        assert await asyncio.wait_for(first.get(), 5) == logs_message("Running", "so far")
+
+        # Nothing has changed since, so the late joiner only has the replayed snapshot
+        _, late = join_run_log_feed("task-3", run, FakeSession(), main.ARGO_NAMESPACE)
+        snapshot = late.get_nowait()
+        feed.subscribers.clear()
+        await asyncio.wait_for(feed.task, 5)
+        return snapshot
+
+    assert asyncio.run(scenario()) == logs_message("Running", "so far")
+
+
+def test_feed_stops_when_the_last_viewer_leaves(monkeypatch):
+    calls = script_refresh(monkeypatch, [("Running", "forever")])
+
+    async def scenario():
+        run = SimpleNamespace(id=4, workflow_id="wf-4")
+        db = FakeSession()
+        feed, queue = join_run_log_feed("task-4", run, db, main.ARGO_NAMESPACE)
+        await asyncio.wait_for(queue.get(), 5)
+        assert main._run_log_feeds[4] is feed
+
+        feed.subscribers.discard(queue)
+        await asyncio.wait_for(feed.task, 5)
+        return db
+
+    db = asyncio.run(scenario())
+    assert calls
+    assert db.closed
+    assert 4 not in main._run_log_feeds
+    assert "wf-4" not in main.workflow_informer._listeners
+
+
+def test_slow_viewer_keeps_only_the_newest_messages():
+    feed = RunLogFeed("task-5", SimpleNamespace(id=5, workflow_id="wf-5"), FakeSession(), main.ARGO_NAMESPACE)
+    queue = feed.subscribe()
+    for i in range(queue.maxsize + 3):
+        feed.publish(logs_message("Running", str(i)))
+
+    messages = [queue.get_nowait() for _ in range(queue.qsize())]
+    assert len(messages) == queue.maxsize
+    assert messages[-1] == logs_message("Running", str(queue.maxsize + 2))
+    assert messages[0] == logs_message("Running", "3")
+
+
+def test_workflow_event_wakes_the_feed_before_the_poll_interval(monkeypatch):
+    monkeypatch.setattr(main, "WS_LOG_POLL_INTERVAL", 60)
+    script_refresh(monkeypatch, [("Running", "a"), ("Succeeded", "a")])
+
+    async def scenario():
+        run = SimpleNamespace(id=6, workflow_id="wf-6")
+        feed, queue = join_run_log_feed("task-6", run, FakeSession(), main.workflow_informer.namespace)
+        assert (await asyncio.wait_for(queue.get(), 5))["workflow_phase"] == "Running"
+        # The informer calls listeners from its watch thread
+        await asyncio.to_thread(main.workflow_informer._notify, ["wf-6"])
+        return await asyncio.wait_for(collect(queue), 5)
+
+    messages = asyncio.run(scenario())
+    assert messages[-2] == {"type": "complete", "workflow_phase": "Succeeded"}
+
+
+def test_websocket_streams_the_latest_run_until_complete(monkeypatch, task_run):
+    script_refresh(monkeypatch, [("Running", "a"), ("Succeeded", "ab")])
+
+    with TestClient(main.app).websocket_connect("/ws/tasks/task-1/logs") as websocket:
+        assert websocket.receive_json() == logs_message("Running", "a")
+        assert websocket.receive_json() == logs_message("Succeeded", "ab")
+        assert websocket.receive_json() == {"type": "complete", "workflow_phase": "Succeeded"}
+
+
+def test_websocket_reports_a_task_without_runs(db):
+    with TestClient(main.app).websocket_connect("/ws/tasks/missing/logs") as websocket:
+        assert websocket.receive_json() == {"type": "error", "message": "No runs found for task missing"}
+
+
+def test_terminal_poll_ends_the_feed_without_refetching(monkeypatch):
+    calls = script_refresh(monkeypatch, [("Succeeded", "all")])
+    fetched = []
+    monkeypatch.setattr(main, "fetch_logs_from_kubernetes", lambda *args: fetched.append(args) or [])
+
+    async def scenario():
+        run = SimpleNamespace(id=7, workflow_id="wf-7")
+        _, queue = join_run_log_feed("task-7", run, FakeSession(), main.ARGO_NAMESPACE)
+        return await collect(queue)
+
+    messages = asyncio.run(scenario())
+    assert messages == [logs_message("Succeeded", "all"), {"type": "complete", "workflow_phase": "Succeeded"}, None]
+    # The refresh that saw the terminal phase already read the final logs
+    assert len(calls) == 1
+    assert fetched == []
+
+
+def test_terminal_poll_without_logs_fetches_them_once(monkeypatch):
+    monkeypatch.setattr(RunLogFeed, "refresh", lambda feed: ("Failed", []))
+    final_logs = [{"pod": "p", "logs": "late"}]
+    fetched, saved = [], []
+    monkeypatch.setattr(main, "fetch_logs_from_kubernetes", lambda *args: fetched.append(args) or final_logs)
+    monkeypatch.setattr(main, "save_logs_to_database", lambda run_id, logs, *args, **kwargs: saved.append((run_id, logs)))
+
+    async def scenario():
+        run = SimpleNamespace(id=8, workflow_id="wf-8")
+        _, queue = join_run_log_feed("task-8", run, FakeSession(), main.ARGO_NAMESPACE)
+        return await collect(queue)
+
+    messages = asyncio.run(scenario())
+    assert fetched == [("wf-8", main.ARGO_NAMESPACE)]
+    assert saved == [(8, final_logs)]
+    assert messages[-3:] == [
+        {"type": "logs", "data": final_logs, "workflow_phase": "Failed"},
+        {"type": "complete", "workflow_phase": "Failed"},
+        None,
+    ]
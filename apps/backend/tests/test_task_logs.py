@@ -0,0 +1,154 @@
+"""upsert_task_logs and LogBatcher."""
+import time
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from app.database import LogBatcher, TaskLog, TaskRun, upsert_task_logs
+
+
+def log_row(run_id: int, pod: str, logs: str, phase: str = "Running") -> dict:
+    return {"run_id": run_id, "node_id": f"node-{pod}", "pod_name": pod, "phase": phase, "logs": logs}
+
+
+def stored_logs(db) -> dict[str, str]:
+    db.expire_all()
+    return {log.pod_name: log.logs for log in db.scalars(select(TaskLog))}
+
+
+def test_upsert_inserts_then_updates(db, task_run):
+    upsert_task_logs(db, [log_row(task_run.id, "a", "one"), log_row(task_run.id, "b", "two")])
+    db.commit()
+    upsert_task_logs(db, [log_row(task_run.id, "a", "one more", "Succeeded")])
+    db.commit()
+
+    assert stored_logs(db) == {"a": "one more", "b": "two"}
+    assert db.scalar(select(TaskLog.phase).where(TaskLog.pod_name == "a")) == "Succeeded"
+
+
+def test_upsert_keeps_last_row_per_pod(db, task_run):
+    executed = []
+    execute = db.execute
+
+    def spy(statement, params=None, *args, **kwargs):
+        executed.append(params)
+        return execute(statement, params, *args, **kwargs)
+
+    db.execute = spy
+    upsert_task_logs(db, [
+        log_row(task_run.id, "a", "first"),
+        log_row(task_run.id, "b", "other"),
+        log_row(task_run.id, "a", "second"),
+    ])
+    db.commit()
+
+    # A single statement may not touch the same key twice: the duplicate never reaches it
+    assert [row["logs"] for row in executed[0]] == ["second", "other"]
+    assert stored_logs(db) == {"a": "second", "b": "other"}
+
+
+def test_upsert_leaves_unchanged_rows_alone(db, task_run):
+    upsert_task_logs(db, [log_row(task_run.id, "a", "same"), log_row(task_run.id, "b", "old")])
+    db.commit()
+    db.execute(text("UPDATE task_logs SET updated_at = '2000-01-01 00:00:00'"))
+    db.commit()
+
+    upsert_task_logs(db, [log_row(task_run.id, "a", "same"), log_row(task_run.id, "b", "new")])
+    db.commit()
+
+    updated_at = {
+        pod_name: str(value)
+        for pod_name, value in db.execute(text("SELECT pod_name, updated_at FROM task_logs"))
+    }
+    assert updated_at["a"].startswith("2000-01-01")
+    assert not updated_at["b"].startswith("2000-01-01")
+
+
+def test_upsert_update_is_conditional_on_postgres():
+    executed = []
+
+    class Bind:
+        dialect = postgresql.dialect()
+
+    class Session:
+        def get_bind(self):
+            return Bind
+
+        def execute(self, statement, rows):
+            executed.append(statement)
+
+    upsert_task_logs(Session(), [log_row(1, "a", "x")])
+    sql = str(executed[0].compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT (run_id, node_id, pod_name) DO UPDATE" in sql
+    assert "WHERE task_logs.logs IS DISTINCT FROM excluded.logs OR task_logs.phase IS DISTINCT FROM excluded.phase" in sql
+
+
+class RecordingBatcher(LogBatcher):
+    """Records flushed batches instead of writing them."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def _flush(self, rows):
+        self.batches.append(rows)
+
+
+def test_batcher_coalesces_rows_per_pod():
+    batcher = RecordingBatcher(max_rows=100, flush_interval_ms=60_000)
+    batcher.start()
+    assert batcher.enqueue([log_row(1, "a", "v1"), log_row(1, "b", "v1")])
+    assert batcher.enqueue([log_row(1, "a", "v2")])
+    assert batcher.enqueue([log_row(1, "a", "v3")])
+    batcher.drain()
+
+    assert len(batcher.batches) == 1
+    assert {row["pod_name"]: row["logs"] for row in batcher.batches[0]} == {"a": "v3", "b": "v1"}
+
+
+def test_batcher_flushes_when_full():
+    batcher = RecordingBatcher(max_rows=2, flush_interval_ms=60_000)
+    batcher.start()
+    batcher.enqueue([log_row(1, "a", "x"), log_row(1, "b", "x")])
+    # Reaching max_rows wakes the writer without waiting for the flush interval
+    deadline = time.monotonic() + 5
+    while not batcher.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    batcher.enqueue([log_row(1, "c", "x")])
+    batcher.drain()
+
+    assert [len(batch) for batch in batcher.batches] == [2, 1]
+
+
+def test_batcher_drain_writes_pending_rows_and_stops(db, task_run):
+    batcher = LogBatcher(max_rows=100, flush_interval_ms=60_000)
+    assert not batcher.enqueue([log_row(task_run.id, "a", "early")])
+    batcher.start()
+    assert batcher.enqueue([log_row(task_run.id, "a", "pending")])
+
+    batcher.drain()
+
+    assert stored_logs(db) == {"a": "pending"}
+    # Stopped: callers fall back to writing inline
+    assert not batcher.enqueue([log_row(task_run.id, "a", "late")])
+
+
+def test_batcher_keeps_other_runs_when_one_run_is_gone(db, task_run):
+    deleted = TaskRun(task_id=task_run.task_id, workflow_id="wf-gone", run_number=2, phase="Running", python_code="x")
+    db.add(deleted)
+    db.commit()
+    deleted_id = deleted.id
+    db.delete(deleted)
+    db.commit()
+
+    batcher = LogBatcher(max_rows=100, flush_interval_ms=60_000)
+    batcher.start()
+    batcher.enqueue([
+        log_row(task_run.id, "a", "kept"),
+        log_row(deleted_id, "b", "orphaned"),
+        log_row(task_run.id, "c", "kept too"),
+    ])
+    batcher.drain()
+
+    assert stored_logs(db) == {"a": "kept", "c": "kept too"}
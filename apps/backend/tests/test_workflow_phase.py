@@ -0,0 +1,39 @@
+"""determine_workflow_phase against fixed Argo workflow status objects."""
+import pytest
+
+from app.main import determine_workflow_phase
+
+
+def pod(phase: str) -> dict:
+    return {"type": "Pod", "phase": phase}
+
+
+DAG = {"type": "DAG", "phase": "Running"}
+
+
+@pytest.mark.parametrize("status, expected", [
+    # Not started
+    ({}, "Pending"),
+    (None, "Pending"),
+    ({"phase": ""}, "Pending"),
+    # Terminal phases are returned as-is, whatever the nodes say
+    ({"phase": "Succeeded", "nodes": {"a": pod("Running")}}, "Succeeded"),
+    ({"phase": "Failed"}, "Failed"),
+    ({"phase": "Error"}, "Error"),
+    # Running workflow: decided by its pod nodes
+    ({"phase": "Running"}, "Pending"),
+    ({"phase": "Running", "nodes": {}}, "Pending"),
+    ({"phase": "Running", "nodes": {"wf": DAG}}, "Pending"),
+    ({"phase": "Running", "nodes": {"wf": DAG, "a": pod("Pending")}}, "Pending"),
+    ({"phase": "Running", "nodes": {"wf": DAG, "a": {"type": "Pod"}}}, "Pending"),
+    ({"phase": "Running", "nodes": {"wf": DAG, "a": pod("Pending"), "b": pod("Running")}}, "Running"),
+    ({"phase": "Running", "nodes": {"wf": DAG, "a": pod("Succeeded")}}, "Running"),
+    ({"phase": "Running", "nodes": {"wf": DAG, "a": pod("Succeeded"), "b": pod("Pending")}}, "Pending"),
+    ({"phase": "Running", "nodes": {"wf": DAG, "a": pod("Failed")}}, "Running"),
+    # Pending workflow whose pod already runs
+    ({"phase": "Pending", "nodes": {"a": pod("Running")}}, "Running"),
+    ({"phase": "Pending", "nodes": {"a": pod("Pending")}}, "Pending"),
+    ({"phase": "Pending"}, "Pending"),
+])
+def test_determine_workflow_phase(status, expected):
+    assert determine_workflow_phase(status) == expected